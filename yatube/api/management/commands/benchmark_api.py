@@ -0,0 +1,71 @@
+from django.urls import reverse
+
+from posts.management.commands import benchmark_views
+from posts.models import Follow, Group, Post
+
+
+class Command(benchmark_views.Command):
+    help = (
+        'Сравнивает JSON API с HTML-страницами на тех же данных: '
+        'задержки p50/p95/p99, запросы к БД и пропускная способность. '
+        'HTML-ленты кешируются целиком, с --cold сравнивается '
+        'стоимость отрисовки'
+    )
+
+    def scenarios(self):
+        return {
+            'index': self.index_urls,
+            'api_posts': self.api_post_urls,
+            'group_posts': self.group_urls,
+            'api_group_posts': self.api_group_urls,
+            'profile': self.profile_urls,
+            'api_author_posts': self.api_author_urls,
+            'post_detail': self.post_detail_urls,
+            'api_post_detail': self.api_post_detail_urls,
+            'api_comments': self.api_comment_urls,
+            'follow_index': self.follow_urls,
+            'api_follow': self.api_follow_urls,
+        }
+
+    def api_post_urls(self, total):
+        return [reverse('api:post_list')] * total
+
+    def api_group_urls(self, total):
+        url = reverse('api:post_list')
+        return [
+            f'{url}?group={slug}'
+            for slug in self.sample(
+                Group.objects.values_list('slug', flat=True), total
+            )
+        ]
+
+    def api_author_urls(self, total):
+        url = reverse('api:post_list')
+        return [
+            f'{url}?author={username}'
+            for username in self.sample(
+                Post.objects.values_list('author__username', flat=True),
+                total
+            )
+        ]
+
+    def api_post_detail_urls(self, total):
+        return [
+            reverse('api:post_detail', kwargs={'post_id': pk})
+            for pk in self.sample(
+                Post.objects.values_list('pk', flat=True), total
+            )
+        ]
+
+    def api_comment_urls(self, total):
+        return [
+            reverse('api:comment_list', kwargs={'post_id': pk})
+            for pk in self.sample(
+                Post.objects.values_list('pk', flat=True), total
+            )
+        ]
+
+    def api_follow_urls(self, total):
+        if not Follow.objects.exists():
+            return []
+        return [reverse('api:follow_feed')] * total
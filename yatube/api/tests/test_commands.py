@@ -0,0 +1,33 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Follow, Group, Post, User
+
+
+class BenchmarkApiTest(TestCase):
+    """Сравнение API с HTML-страницами."""
+
+    def test_benchmark_api(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Пост', author=author, group=group)
+        Follow.objects.create(user=reader, author=author)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = os.path.join(directory, 'run.json')
+
+        call_command(
+            'benchmark_api', requests=2, output=output, stdout=StringIO()
+        )
+        with open(output) as run:
+            results = json.load(run)['results']
+        self.assertIn('api_posts', results)
+        self.assertIn('api_follow', results)
+        self.assertEqual(results['api_posts']['queries'], 1)
@@ -0,0 +1,118 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+POSTS_TOTAL = 25
+
+
+class ApiViewsTest(TestCase):
+    """JSON API только для чтения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None
+            )
+            for i in range(POSTS_TOTAL)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.status_code, response.json()
+
+    def test_post_pages(self):
+        """Курсор проходит все посты от новых к старым без повторов."""
+        url = reverse('api:post_list') + '?limit=10'
+        seen = []
+        while url:
+            with self.assertNumQueries(1):
+                status, data = self.get(url)
+            self.assertEqual(status, HTTPStatus.OK)
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только перечисленные поля."""
+        status, data = self.get(
+            reverse('api:post_detail', kwargs={'post_id': self.posts[1].pk}),
+            fields='id,author,group'
+        )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(data, {
+            'id': self.posts[1].pk,
+            'author': self.author.username,
+            'group': self.group.slug,
+        })
+
+    def test_bad_requests(self):
+        """Неизвестное поле, битый курсор и лишний метод отклоняются."""
+        url = reverse('api:post_list')
+        for params in ({'fields': 'password'}, {'after': 'broken'}):
+            with self.subTest(params=params):
+                status, data = self.get(url, **params)
+                self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+                self.assertIn('error', data)
+        self.assertEqual(
+            self.client.post(url).status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+
+    def test_filters_and_comments(self):
+        """Посты группы и автора, комментарии к посту."""
+        url = reverse('api:post_list')
+        _, data = self.get(url, group=self.group.slug, limit=100)
+        self.assertEqual(len(data['results']), POSTS_TOTAL // 2)
+        _, data = self.get(url, author=self.reader.username)
+        self.assertEqual(data['results'], [])
+        _, data = self.get(
+            reverse('api:comment_list', kwargs={'post_id': self.posts[0].pk})
+        )
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+        status, _ = self.get(
+            reverse('api:comment_list', kwargs={'post_id': 0})
+        )
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+    def test_groups(self):
+        """Группы отдаются по slug."""
+        Group.objects.create(title='Вторая', slug='another')
+        _, data = self.get(reverse('api:group_list'), limit=1)
+        self.assertEqual(data['results'], [
+            {'slug': 'another', 'title': 'Вторая', 'description': ''}
+        ])
+        _, data = self.get(data['next'])
+        self.assertEqual(data['results'][0]['slug'], self.group.slug)
+        self.assertIsNone(data['next'])
+        status, _ = self.get(
+            reverse('api:group_detail', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+    def test_follow_feed(self):
+        """Лента подписок доступна только авторизованному."""
+        url = reverse('api:follow_feed')
+        status, _ = self.get(url)
+        self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+        client = Client()
+        client.force_login(self.reader)
+        data = client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(data['results'][0], {'id': self.posts[-1].pk})
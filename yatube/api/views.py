@@ -0,0 +1,236 @@
+"""JSON API только для чтения.
+
+Ответы собираются из .values() без создания моделей, страницы
+отдаются курсорами (keyset), поэтому каждый ответ стоит постоянного
+числа запросов. Параметр ?fields= выбирает нужные поля ресурса,
+и в запрос к базе попадают только они.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+from core.db_router import read_replica
+from core.paginator import decode_cursor, make_cursor
+from posts.models import Comment, Group, Post
+
+API_PAGE = 20
+MAX_API_PAGE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def media_url(name):
+    return f'{settings.MEDIA_URL}{name}' if name else None
+
+
+class Resource:
+    """Поля ресурса: публичное имя -> путь в ORM и преобразование."""
+
+    def __init__(self, fields, converters=None):
+        self.fields = fields
+        self.converters = converters or {}
+
+    def prefixed(self, prefix):
+        """Тот же ресурс, прочитанный через связь prefix."""
+        fields = {
+            name: f'{prefix}{lookup}' for name, lookup in self.fields.items()
+        }
+        return Resource(fields, self.converters)
+
+    def select(self, request):
+        """Имена полей из ?fields=, по умолчанию - все поля."""
+        names = [
+            name.strip()
+            for name in request.GET.get('fields', '').split(',')
+            if name.strip()
+        ]
+        unknown = set(names) - set(self.fields)
+        if unknown:
+            raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}')
+        return names or list(self.fields)
+
+    def values(self, queryset, names, *extra):
+        lookups = {self.fields[name] for name in names}
+        return queryset.values(*lookups.union(extra))
+
+    def serialize(self, row, names):
+        result = {}
+        for name in names:
+            value = row[self.fields[name]]
+            convert = self.converters.get(name)
+            result[name] = convert(value) if convert else value
+        return result
+
+
+POST = Resource(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    },
+    {'image': media_url}
+)
+GROUP = Resource({
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+})
+COMMENT = Resource({
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'pub_date': 'pub_date',
+})
+
+
+def render(data, status=200):
+    # Компактный JSON: без пробелов и без экранирования кириллицы
+    content = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return HttpResponse(
+        content, status=status, content_type='application/json'
+    )
+
+
+def api_view(view):
+    """Только GET и HEAD с чтением с реплик.
+
+    Ошибки ApiError превращаются в JSON-ответ.
+    """
+    @require_safe
+    @read_replica
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return render(view(request, *args, **kwargs))
+        except ApiError as error:
+            return render({'error': str(error)}, error.status)
+    return wrapper
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', API_PAGE))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом')
+    return max(1, min(size, MAX_API_PAGE))
+
+
+def next_link(request, token):
+    if token is None:
+        return None
+    query = request.GET.copy()
+    query['after'] = token
+    return request.build_absolute_uri(f'?{query.urlencode()}')
+
+
+def dated_page(request, resource, queryset, date='pub_date', pk='pk'):
+    """Страница записей от новых к старым по курсору ?after=.
+
+    Курсор - пара (date, pk) последней записи, как у курсорной
+    пагинации HTML-лент: один запрос по индексу на любой глубине.
+    """
+    names = resource.select(request)
+    size = page_size(request)
+    token = request.GET.get('after')
+    if token:
+        after = decode_cursor(token)
+        if after is None:
+            raise ApiError(400, 'Некорректный курсор')
+        queryset = queryset.filter(
+            Q(**{f'{date}__lt': after[0]})
+            | Q(**{date: after[0], f'{pk}__lt': after[1]})
+        )
+    rows = list(
+        resource.values(queryset, names, date, pk)
+        .order_by(f'-{date}', f'-{pk}')[:size + 1]
+    )
+    last = rows[size - 1] if len(rows) > size else None
+    return {
+        'results': [resource.serialize(row, names) for row in rows[:size]],
+        'next': next_link(
+            request, last and make_cursor(last[date], last[pk])
+        ),
+    }
+
+
+def detail(request, resource, queryset):
+    names = resource.select(request)
+    row = resource.values(queryset, names).first()
+    if row is None:
+        raise ApiError(404, 'Не найдено')
+    return resource.serialize(row, names)
+
+
+@api_view
+def post_list(request):
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return dated_page(request, POST, posts)
+
+
+@api_view
+def post_detail(request, post_id):
+    return detail(request, POST, Post.objects.filter(pk=post_id))
+
+
+@api_view
+def comment_list(request, post_id):
+    page = dated_page(request, COMMENT, Comment.objects.filter(post=post_id))
+    if not page['results'] and not Post.objects.filter(pk=post_id).exists():
+        raise ApiError(404, 'Пост не найден')
+    return page
+
+
+@api_view
+def group_list(request):
+    """Группы по алфавиту slug, курсор - slug последней группы."""
+    names = GROUP.select(request)
+    size = page_size(request)
+    groups = Group.objects.all()
+    if request.GET.get('after'):
+        groups = groups.filter(slug__gt=request.GET['after'])
+    rows = list(
+        GROUP.values(groups, names, 'slug').order_by('slug')[:size + 1]
+    )
+    return {
+        'results': [GROUP.serialize(row, names) for row in rows[:size]],
+        'next': next_link(
+            request, rows[size - 1]['slug'] if len(rows) > size else None
+        ),
+    }
+
+
+@api_view
+def group_detail(request, slug):
+    return detail(request, GROUP, Group.objects.filter(slug=slug))
+
+
+@api_view
+def follow_feed(request):
+    """Лента подписок текущего пользователя."""
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Требуется авторизация')
+    return dated_page(
+        request, POST.prefixed('post__'), request.user.timeline.all()
+    )
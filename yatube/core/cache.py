@@ -0,0 +1,100 @@
+"""Кеширование страниц с инвалидацией по поколениям.
+
+Каждой ленте соответствует счетчик поколения в кеше. Номер поколения
+входит в ключ закешированной страницы, поэтому страницы можно хранить
+долго: при изменении содержимого счетчик увеличивается, и следующие
+запросы читают страницы уже по новым ключам.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from core.db_router import use_primary
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+GENERATION_KEY = 'generation:{}'
+
+
+def _initial_generation():
+    # Поколение, вытесненное из кеша, не должно начинаться заново
+    # с единицы, иначе снова станут доступны устаревшие страницы
+    return int(time.time() * 1000)
+
+
+def get_generation(name):
+    """Текущее поколение ленты name."""
+    key = GENERATION_KEY.format(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _incr_generations(names):
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+
+
+def bump_generation(*names):
+    """Сбрасывает закешированные страницы перечисленных лент.
+
+    Поколение увеличивается сразу и еще раз после фиксации транзакции:
+    иначе параллельный запрос успел бы закешировать старые данные
+    под новым поколением.
+    """
+    _incr_generations(names)
+    transaction.on_commit(lambda: _incr_generations(names))
+
+
+def _cookie_digest(request):
+    cookie = request.META.get('HTTP_COOKIE', '')
+    return hashlib.md5(cookie.encode()).hexdigest()[:16]
+
+
+def cache_feed(namespace, timeout=FEED_CACHE_TIMEOUT):
+    """Кеширует ответ view с учетом поколения ленты.
+
+    namespace - имя ленты или функция, получающая именованные
+    аргументы view и возвращающая имя ленты. Ключ страницы, как и у
+    cache_page, учитывает полный URL, то есть номер страницы и курсор.
+    Страницы содержат шапку с текущим пользователем, поэтому ключ
+    зависит и от cookie: Vary, который выставит SessionMiddleware,
+    декоратор уже не увидит.
+
+    Из поколения и cookie складывается и ETag страницы: на запрос
+    с совпавшим If-None-Match сразу отдается 304 без обращения
+    к кешу страниц и к базе.
+
+    Промах кеша рендерится из основной базы, даже внутри read_replica:
+    реплика обновляется не сразу, и страница без нового поста
+    хранилась бы под поколением, которое запись уже увеличила.
+    """
+    def decorator(view):
+        @vary_on_cookie
+        @wraps(view)
+        def render(request, *args, **kwargs):
+            with use_primary():
+                return view(request, *args, **kwargs)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            name = namespace(**kwargs) if callable(namespace) else namespace
+            generation = get_generation(name)
+            etag = f'{generation}-{_cookie_digest(request)}'
+            cached_view = condition(etag_func=lambda *args, **kwargs: etag)(
+                cache_page(timeout, key_prefix=f'{name}:{generation}')(render)
+            )
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
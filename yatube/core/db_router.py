@@ -0,0 +1,82 @@
+"""Чтение с реплик базы данных.
+
+Запросы view, отмеченных декоратором read_replica, читают со случайной
+реплики из settings.DATABASE_REPLICAS. Запись всегда идет в основную
+базу. После собственного изменения пользователь REPLICA_STICKY_SECONDS
+секунд читает из основной базы (см. core.middleware.StickyPrimaryMiddleware),
+чтобы сразу видеть свой пост или комментарий, даже если реплика отстает.
+Страницы, кешируемые cache_feed, на промахе кеша рендерятся из основной
+базы: иначе отставшая реплика попала бы в кеш на все время его жизни.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'primary_db'
+SAFE_METHODS = ('GET', 'HEAD')
+# Сессия и текущий пользователь загружаются лениво, уже внутри view:
+# отставшая реплика не должна разлогинивать пользователя
+PRIMARY_APPS = ('auth', 'sessions')
+
+_state = threading.local()
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_replica(alias):
+    """Направляет чтение текущего потока в базу alias."""
+    previous = getattr(_state, 'alias', None)
+    _state.alias = alias
+    try:
+        yield
+    finally:
+        _state.alias = previous
+
+
+def use_primary():
+    """Направляет чтение текущего потока в основную базу."""
+    return use_replica(None)
+
+
+def read_replica(view):
+    """Читает с реплики для GET и HEAD, если пользователь недавно не писал."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            not replicas()
+            or request.method not in SAFE_METHODS
+            or STICKY_COOKIE in request.COOKIES
+        ):
+            return view(request, *args, **kwargs)
+        with use_replica(random.choice(replicas())):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтение - с выбранной для запроса реплики, запись - в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'alias', None)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными от основной базы
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.sqlite_cache import SQLiteCache
+
+BACKENDS = ('locmem', 'sqlite')
+PAYLOAD = 'x' * 2048
+
+
+def make_cache(backend, location):
+    if backend == 'sqlite':
+        return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    return LocMemCache(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def worker(args):
+    """Читает ключи с перекосом популярности, промахи дописывает в кеш."""
+    backend, location, operations, keys, seed = args
+    cache = make_cache(backend, location)
+    rnd = random.Random(seed)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f'key:{int(rnd.paretovariate(1.2)) % keys}'
+        if cache.get(key) is None:
+            cache.set(key, PAYLOAD)
+        else:
+            hits += 1
+        # Счетчик поколений ленты: самый горячий ключ на запись
+        if not cache.add('counter', 1):
+            cache.incr('counter')
+    return hits, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SQLiteCache и LocMemCache при разном числе процессов: '
+        'пропускную способность и долю попаданий'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 4, 16]
+        )
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"backend":<8} {"workers":>7} {"ops/s":>10} {"hit rate":>9}'
+        )
+        for backend in BACKENDS:
+            for workers in options['workers']:
+                with tempfile.TemporaryDirectory() as directory:
+                    location = os.path.join(directory, 'cache.sqlite3')
+                    jobs = [
+                        (
+                            backend,
+                            location,
+                            options['operations'],
+                            options['keys'],
+                            seed,
+                        )
+                        for seed in range(workers)
+                    ]
+                    started = time.perf_counter()
+                    with context.Pool(workers) as pool:
+                        results = pool.map(worker, jobs)
+                    elapsed = time.perf_counter() - started
+                total = options['operations'] * workers
+                hits = sum(hits for hits, _ in results)
+                self.stdout.write(
+                    f'{backend:<8} {workers:>7} {total / elapsed:>10.0f} '
+                    f'{hits / total:>9.1%}'
+                )
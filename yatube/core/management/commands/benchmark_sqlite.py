@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sqlite_backend import PRODUCTION_OPTIONS, PRODUCTION_PRAGMAS
+
+# Настройки стандартного бэкенда Django и профиль core.sqlite_backend
+PROFILES = {
+    'default': {'pragmas': (), 'begin': 'BEGIN', 'timeout': 5},
+    'production': {
+        'pragmas': PRODUCTION_PRAGMAS,
+        'begin': f'BEGIN {PRODUCTION_OPTIONS["transaction_mode"]}',
+        'timeout': PRODUCTION_OPTIONS['timeout'],
+    },
+}
+SCHEMA = '''
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX post_author ON post (author_id, pub_date);
+CREATE TABLE stats (
+    user_id INTEGER PRIMARY KEY,
+    posts_count INTEGER NOT NULL
+);
+'''
+USERS = 100
+TEXT = 'x' * 400
+
+
+def connect(path, profile):
+    connection = sqlite3.connect(
+        path, timeout=profile['timeout'], isolation_level=None
+    )
+    for pragma in profile['pragmas']:
+        connection.execute(pragma)
+    return connection
+
+
+def write(connection, profile, rnd):
+    """Как post_create: чтение и запись в одной транзакции."""
+    author = rnd.randrange(USERS)
+    connection.execute(profile['begin'])
+    try:
+        connection.execute(
+            'SELECT posts_count FROM stats WHERE user_id = ?', (author,)
+        ).fetchone()
+        connection.execute(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            (author, TEXT, time.time())
+        )
+        connection.execute(
+            'UPDATE stats SET posts_count = posts_count + 1 '
+            'WHERE user_id = ?', (author,)
+        )
+        connection.execute('COMMIT')
+    except sqlite3.OperationalError:
+        connection.execute('ROLLBACK')
+        raise
+
+
+def read(connection, rnd):
+    """Как страница профиля: последние посты автора."""
+    connection.execute(
+        'SELECT id, text FROM post WHERE author_id = ? '
+        'ORDER BY pub_date DESC LIMIT 10', (rnd.randrange(USERS),)
+    ).fetchall()
+
+
+def worker(args):
+    name, path, operations, write_ratio, seed = args
+    profile = PROFILES[name]
+    connection = connect(path, profile)
+    rnd = random.Random(seed)
+    writes = errors = 0
+    latencies = []
+    for _ in range(operations):
+        started = time.perf_counter()
+        try:
+            if rnd.random() < write_ratio:
+                write(connection, profile, rnd)
+                writes += 1
+            else:
+                read(connection, rnd)
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return writes, errors, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартные настройки SQLite с профилем '
+        'core.sqlite_backend при параллельных чтениях и записях: '
+        'пропускную способность, p95 и ошибки "database is locked"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 4, 16]
+        )
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля операций записи'
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"profile":<11} {"workers":>7} {"ops/s":>9} {"writes/s":>9} '
+            f'{"p95 ms":>8} {"errors":>7}'
+        )
+        for name in PROFILES:
+            for workers in options['workers']:
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, 'bench.sqlite3')
+                    self.prepare(path)
+                    jobs = [
+                        (
+                            name,
+                            path,
+                            options['operations'],
+                            options['write_ratio'],
+                            seed,
+                        )
+                        for seed in range(workers)
+                    ]
+                    started = time.perf_counter()
+                    with context.Pool(workers) as pool:
+                        results = pool.map(worker, jobs)
+                    elapsed = time.perf_counter() - started
+                total = options['operations'] * workers
+                writes = sum(result[0] for result in results)
+                errors = sum(result[1] for result in results)
+                latencies = sorted(
+                    latency for result in results for latency in result[2]
+                )
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000
+                self.stdout.write(
+                    f'{name:<11} {workers:>7} {total / elapsed:>9.0f} '
+                    f'{writes / elapsed:>9.0f} {p95:>8.1f} {errors:>7}'
+                )
+
+    def prepare(self, path):
+        connection = sqlite3.connect(path, isolation_level=None)
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            'INSERT INTO stats (user_id, posts_count) VALUES (?, 0)',
+            [(user,) for user in range(USERS)]
+        )
+        connection.close()
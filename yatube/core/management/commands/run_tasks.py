@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+from core.models import Task
+
+PURGE_EVERY = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер фоновых задач: забирает задачи из таблицы Task '
+        'и выполняет их в пуле потоков'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4, help='Число потоков'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать размер очереди и задержки и выйти'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.show_stats()
+            return
+        workers = options['workers']
+        running = set()
+        purged = 0
+        with ThreadPoolExecutor(
+            workers, thread_name_prefix='tasks'
+        ) as pool:
+            while True:
+                if time.monotonic() - purged > PURGE_EVERY:
+                    tasks.purge()
+                    purged = time.monotonic()
+                # Задачи забираются, только когда есть свободный поток
+                for job in tasks.claim(workers - len(running)):
+                    running.add(pool.submit(self.run, job))
+                if not running:
+                    if options['once']:
+                        break
+                    # Между опросами соединение не держит файл базы
+                    close_old_connections()
+                    time.sleep(options['poll'])
+                    continue
+                _, running = wait(
+                    running, timeout=options['poll'],
+                    return_when=FIRST_COMPLETED
+                )
+
+    def run(self, job):
+        try:
+            tasks.execute(job)
+        finally:
+            close_old_connections()
+
+    def show_stats(self):
+        stats = tasks.stats()
+        self.stdout.write(', '.join(
+            f'{label}: {stats[status]}' for status, label in Task.STATUSES
+        ))
+        self.stdout.write(
+            f'Самая старая готовая задача ждет {stats["oldest_due"]:.1f} с'
+        )
+        for key, label in (('wait', 'Ожидание'), ('total', 'Всего')):
+            values = stats[key]
+            self.stdout.write(
+                f'{label}: в среднем {values["avg"]:.3f} с, '
+                f'p95 {values["p95"]:.3f} с, max {values["max"]:.3f} с'
+            )
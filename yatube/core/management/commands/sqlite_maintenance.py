@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание базы SQLite: ANALYZE, инкрементальный VACUUM '
+        'и контрольная точка WAL. С --every повторяется по расписанию'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=1000,
+            help='Сколько свободных страниц вернуть за проход'
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Перевести базу в auto_vacuum=INCREMENTAL (полный VACUUM)'
+        )
+        parser.add_argument(
+            '--every', type=int, default=0,
+            help='Повторять каждые N секунд'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда обслуживает только SQLite')
+        if options['enable_incremental_vacuum']:
+            self.enable_incremental_vacuum(connection)
+        while True:
+            self.maintain(connection, options['vacuum_pages'])
+            if not options['every']:
+                break
+            # Между проходами соединение не держит файл базы
+            connection.close()
+            time.sleep(options['every'])
+
+    def enable_incremental_vacuum(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            # Режим вступает в силу только после полного VACUUM
+            cursor.execute('VACUUM')
+        self.stdout.write('auto_vacuum=INCREMENTAL включен')
+
+    def maintain(self, connection, vacuum_pages):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute('PRAGMA freelist_count')
+            free_pages = cursor.fetchone()[0]
+            cursor.execute('PRAGMA auto_vacuum')
+            if cursor.fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+                # Прагма освобождает по странице на шаг выполнения,
+                # а execute() делает один шаг; executescript() - все
+                connection.connection.executescript(
+                    f'PRAGMA incremental_vacuum({vacuum_pages})'
+                )
+            elif free_pages:
+                self.stdout.write(
+                    'Свободные страницы возвращаются только в режиме '
+                    'auto_vacuum=INCREMENTAL, см. '
+                    '--enable-incremental-vacuum'
+                )
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            busy, wal_pages, checkpointed = cursor.fetchone()
+        self.stdout.write(
+            f'ANALYZE, свободных страниц было {free_pages}, '
+            f'WAL: {checkpointed}/{wal_pages} страниц '
+            f'{"(заняты читателями) " if busy else ""}'
+            f'за {time.perf_counter() - started:.2f} с'
+        )
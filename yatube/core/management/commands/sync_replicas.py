@@ -0,0 +1,43 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_sqlite(source, target):
+    """Копирует файл базы целиком через backup API SQLite.
+
+    Копия согласована, даже если в основную базу в это время пишут.
+    """
+    source = sqlite3.connect(source)
+    target = sqlite3.connect(target)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы-реплики из '
+        'DATABASE_REPLICAS, чтобы проверить чтение с реплик локально'
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError(
+                'Репликацией не-SQLite баз занимается сам сервер БД'
+            )
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write(
+                'Реплик нет: задайте YATUBE_SQLITE_REPLICAS=<число>'
+            )
+        for alias in settings.DATABASE_REPLICAS:
+            replica = settings.DATABASES[alias]
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'Реплика {alias} - не SQLite')
+            copy_sqlite(primary['NAME'], replica['NAME'])
+            self.stdout.write(f'{alias}: {replica["NAME"]}')
@@ -0,0 +1,110 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import db_router, timing
+
+logger = logging.getLogger(__name__)
+
+
+class TimingMiddleware:
+    """Замеряет запрос и отдает метрики в заголовке Server-Timing.
+
+    Каждая строка лога - JSON с метриками запроса. Если задан
+    TIMING_SLOW_LOG, в этот файл сохраняются TIMING_SLOWEST самых
+    медленных запросов процесса.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_log = getattr(settings, 'TIMING_SLOW_LOG', None)
+        self.slowest = getattr(settings, 'TIMING_SLOWEST', 20)
+        self.heap = []
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        stats = timing.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.query_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.stop()
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.db_time * 1000:.1f};'
+            f'desc="{stats.queries} queries"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+            f'cache;desc="hits={stats.cache_hits} '
+            f'misses={stats.cache_misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(stats.db_time * 1000, 1),
+            'queries': stats.queries,
+            'template_ms': round(stats.template_time * 1000, 1),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+        }
+        logger.info(json.dumps(record))
+        if self.slow_log:
+            self.sample(total, record)
+        return response
+
+    def sample(self, total, record):
+        """Обновляет файл с самыми медленными запросами.
+
+        Файл переписывается, только когда запрос попадает в число
+        самых медленных, то есть редко после прогрева.
+        """
+        item = (total, id(record), record)
+        with self.lock:
+            if len(self.heap) < self.slowest:
+                heapq.heappush(self.heap, item)
+            elif total > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+            else:
+                return
+            slowest = sorted(self.heap, key=lambda item: item[0], reverse=True)
+            with open(self.slow_log, 'w') as slow_log:
+                for _, _, slow in slowest:
+                    slow_log.write(json.dumps(slow) + '\n')
+
+
+class StickyPrimaryMiddleware:
+    """Закрепляет пользователя за основной базой после его записи.
+
+    Ответ на запрос, изменяющий данные, ставит короткоживущую cookie,
+    пока она есть, read_replica не отправляет чтение на реплики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_age = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            db_router.replicas()
+            and request.method not in db_router.SAFE_METHODS
+        ):
+            response.set_cookie(
+                db_router.STICKY_COOKIE, '1',
+                max_age=self.max_age, httponly=True, samesite='Lax'
+            )
+        return response
@@ -1,9 +1,133 @@
+import base64
+import binascii
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 POSTS_ON_PAGE = 10
 
 
-def paginator(request, items):
+class CursorPage:
+    """Страница курсорной (keyset) пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page, которым
+    пользуются шаблоны, но не знает общего количества страниц:
+    вместо номеров соседние страницы адресуются курсорами.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage after={self.next_cursor}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def make_cursor(date, pk):
+    """Упаковывает пару (дата, id) в непрозрачный токен."""
+    value = f'{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def encode_cursor(obj, date_field='pub_date'):
+    """Токен курсора для объекта модели."""
+    return make_cursor(getattr(obj, date_field), obj.pk)
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, для битого токена возвращает None."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        value = base64.urlsafe_b64decode(token + padding).decode()
+        date, pk = value.rsplit('|', 1)
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+def cursor_paginator(request, items, date_field='pub_date',
+                     per_page=POSTS_ON_PAGE):
+    """Курсорная пагинация по (date_field, id) без COUNT и OFFSET.
+
+    Токен ?after= открывает страницу со следующими (более старыми)
+    записями, ?before= - с предыдущими (более новыми). Каждая страница
+    стоит одного запроса по индексу независимо от глубины.
+    """
+    after = decode_cursor(request.GET.get('after', ''))
+    before = decode_cursor(request.GET.get('before', ''))
+    newest_first = (f'-{date_field}', '-pk')
+
+    if before is not None:
+        date, pk = before
+        rows = list(
+            items.filter(
+                Q(**{f'{date_field}__gt': date})
+                | Q(**{date_field: date, 'pk__gt': pk})
+            ).order_by(date_field, 'pk')[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = bool(rows)
+    else:
+        if after is not None:
+            date, pk = after
+            items = items.filter(
+                Q(**{f'{date_field}__lt': date})
+                | Q(**{date_field: date, 'pk__lt': pk})
+            )
+        rows = list(items.order_by(*newest_first)[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = after is not None and bool(rows)
+
+    return CursorPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], date_field) if has_next else None,
+        previous_cursor=(
+            encode_cursor(rows[0], date_field) if has_previous else None
+        ),
+    )
+
+
+def paginator(request, items, date_field='pub_date'):
+    """Пагинация ленты.
+
+    По умолчанию используется курсорная пагинация. Номер страницы
+    (?page=) по-прежнему поддерживается для старых ссылок.
+    """
+    if request.GET.get('page') is None:
+        return cursor_paginator(request, items, date_field)
+    return page_paginator(request, items)
+
+
+def page_paginator(request, items):
+    """Пагинация по номеру страницы (?page=)."""
     paginator = Paginator(items, POSTS_ON_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -0,0 +1,34 @@
+"""Бэкенд SQLite с прагмами на каждое соединение и BEGIN IMMEDIATE.
+
+Ключи OPTIONS повторяют появившиеся в Django 5.1 параметры
+стандартного бэкенда:
+
+    'OPTIONS': {
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    }
+
+init_command выполняется на каждом новом соединении. transaction_mode
+задает вид BEGIN для transaction.atomic: транзакция IMMEDIATE берет
+блокировку записи сразу и ждет ее не дольше timeout, а не падает
+с "database is locked" при попытке повысить блокировку чтения.
+"""
+
+# Профиль для сервера с параллельными запросами
+PRODUCTION_PRAGMAS = (
+    # Читатели не блокируют писателя и не ждут его
+    'PRAGMA journal_mode=WAL',
+    # В режиме WAL fsync нужен только на контрольной точке
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    # Страничный кеш соединения в КиБ и отображение файла в память
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+PRODUCTION_OPTIONS = {
+    'init_command': '; '.join(PRODUCTION_PRAGMAS),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
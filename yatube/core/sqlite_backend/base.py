@@ -0,0 +1,21 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Стандартный бэкенд SQLite с init_command и transaction_mode."""
+
+    def get_new_connection(self, conn_params):
+        # sqlite3.connect() не знает этих параметров
+        conn_params = dict(conn_params)
+        init_command = conn_params.pop('init_command', '')
+        conn_params.pop('transaction_mode', None)
+        connection = super().get_new_connection(conn_params)
+        for statement in init_command.split(';'):
+            if statement.strip():
+                connection.execute(statement)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # DEFERRED, IMMEDIATE или EXCLUSIVE, по умолчанию - DEFERRED
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
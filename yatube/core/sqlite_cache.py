@@ -0,0 +1,272 @@
+"""Бэкенд кеша в файле SQLite, общий для всех процессов сервера.
+
+В отличие от LocMemCache данные видны всем WSGI-воркерам, поэтому
+закешированные страницы, метаданные миниатюр и счетчики поколений
+не дублируются в каждом процессе, а инвалидация доходит до всех.
+Внешних сервисов не требуется: файл работает в режиме WAL, читатели
+не блокируют писателя.
+
+Пример настройки:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.sqlite_cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import timing
+
+# Число записей хранится в cache_size и обновляется триггерами:
+# проверка переполнения при каждой записи не считает всю таблицу.
+# Схема создается в одной транзакции, чтобы запись другого процесса
+# не проскочила между подсчетом и созданием триггеров
+SCHEMA = '''
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size (id, entries)
+    SELECT 1, COUNT(*) FROM cache
+    WHERE NOT EXISTS (SELECT 1 FROM cache_size);
+CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache
+    BEGIN UPDATE cache_size SET entries = entries + 1; END;
+CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache
+    BEGIN UPDATE cache_size SET entries = entries - 1; END;
+COMMIT;
+'''
+# Время последнего чтения обновляется не чаще раза в секунду,
+# чтобы горячие ключи не превращали каждое чтение в запись
+ACCESS_RESOLUTION = 1.0
+# Ограничение SQLite на число параметров запроса
+MAX_PARAMS = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кеш с атомарным incr, пакетными операциями и вытеснением LRU."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение свое у каждого потока и каждого процесса:
+        # после fork унаследованным соединением пользоваться нельзя
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _count(self, connection):
+        return connection.execute(
+            'SELECT entries FROM cache_size'
+        ).fetchone()[0]
+
+    def _cull(self, connection, now):
+        count = self._count(connection)
+        if count <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = self._count(connection)
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,)
+        )
+
+    def _store(self, connection, key, value, timeout, now):
+        # Не INSERT OR REPLACE: удаление при замене не вызывает
+        # триггер, и счетчик записей разошелся бы с таблицей
+        connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed',
+            (
+                key,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout),
+                now,
+            )
+        )
+
+    def _touch_accessed(self, connection, keys, now):
+        if keys:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(now, key) for key in keys]
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and (row[0] is None or row[0] > now):
+                return False
+            self._store(connection, key, value, timeout, now)
+            self._cull(connection, now)
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            timing.record_cache(hits=0, misses=1)
+            return default
+        value, expires, accessed = row
+        timing.record_cache(hits=1, misses=0)
+        if now - accessed > ACCESS_RESOLUTION:
+            self._touch_accessed(connection, [key], now)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            self._store(connection, key, value, timeout, now)
+            self._cull(connection, now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            cursor = connection.execute(
+                'DELETE FROM cache WHERE key = ?', (key,)
+            )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        cache_key = self._key(key, version)
+        now = time.time()
+        # BEGIN IMMEDIATE берет блокировку записи до чтения значения,
+        # поэтому параллельные incr из разных процессов не теряются
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (cache_key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now, cache_key)
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        now = time.time()
+        connection = self._connection()
+        result = {}
+        stale = []
+        cache_keys = list(keys)
+        for start in range(0, len(cache_keys), MAX_PARAMS):
+            chunk = cache_keys[start:start + MAX_PARAMS]
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            for cache_key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                if now - accessed > ACCESS_RESOLUTION:
+                    stale.append(cache_key)
+                result[keys[cache_key]] = pickle.loads(value)
+        self._touch_accessed(connection, stale, now)
+        timing.record_cache(hits=len(result), misses=len(keys) - len(result))
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as connection:
+            for key, value in data.items():
+                self._store(
+                    connection, self._key(key, version), value, timeout, now
+                )
+            self._cull(connection, now)
+        return []
+
+    def delete_many(self, keys, version=None):
+        with self._write() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys]
+            )
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
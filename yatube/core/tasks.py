@@ -0,0 +1,202 @@
+"""Фоновые задачи в таблице базы.
+
+Запрос только записывает намерение: task.delay() добавляет строку
+Task в текущую транзакцию. Воркер (команда run_tasks) видит строку
+только после фиксации, а при откате она исчезает вместе с остальными
+изменениями - как с transaction.on_commit, но задача не теряется,
+если процесс упадет сразу после фиксации.
+
+Воркер забирает задачи условным UPDATE, поэтому воркеров может быть
+несколько. Упавшая задача повторяется с экспоненциальной задержкой,
+задача, чей воркер пропал, возвращается в очередь через LEASE.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+MAX_ATTEMPTS = 5
+# Задержка перед n-й повторной попыткой: BACKOFF * 2 ** (n - 1)
+BACKOFF = timedelta(seconds=10)
+MAX_BACKOFF = timedelta(hours=1)
+# Задача дольше LEASE в работе считается брошенной
+LEASE = timedelta(minutes=10)
+KEEP_DONE = timedelta(days=1)
+STATS_SAMPLE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def task(func=None, *, max_attempts=MAX_ATTEMPTS):
+    """Делает функцию фоновой задачей с методом delay().
+
+    Аргументы задачи сохраняются в JSON, поэтому передаются pk
+    и простые значения, а не объекты.
+    """
+    if func is None:
+        return lambda func: task(func, max_attempts=max_attempts)
+
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @wraps(func)
+    def delay(*args, **kwargs):
+        return enqueue(name, args, kwargs, max_attempts=max_attempts)
+
+    func.task_name = name
+    func.delay = delay
+    return func
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=MAX_ATTEMPTS):
+    """Ставит задачу name в очередь в текущей транзакции."""
+    arguments = json.dumps([list(args), kwargs or {}], cls=DjangoJSONEncoder)
+    return Task.objects.create(
+        name=name, arguments=arguments, max_attempts=max_attempts
+    )
+
+
+def backoff(attempt):
+    """Задержка перед повтором после attempt-й попытки.
+
+    Случайный разброс не дает повторам упавших вместе задач совпасть.
+    """
+    delay = min(BACKOFF * 2 ** (attempt - 1), MAX_BACKOFF)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def claim(limit):
+    """Забирает до limit готовых к выполнению задач.
+
+    Условие UPDATE повторяет прочитанные статус и число попыток,
+    поэтому одну задачу забирает только один воркер.
+    """
+    now = timezone.now()
+    due = (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, started__lt=now - LEASE)
+    )
+    candidates = Task.objects.filter(due).values_list(
+        'pk', 'status', 'attempts'
+    )[:limit]
+    claimed = [
+        pk for pk, status, attempts in candidates
+        if Task.objects.filter(
+            pk=pk, status=status, attempts=attempts
+        ).update(status=Task.RUNNING, started=now, attempts=attempts + 1)
+    ]
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def resolve(name):
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ImportError(f'{name} не является задачей')
+    return func
+
+
+def execute(job):
+    """Выполняет забранную задачу и записывает результат."""
+    current = Task.objects.filter(pk=job.pk, attempts=job.attempts)
+    try:
+        func = resolve(job.name)
+    except ImportError:
+        # Повтор не поможет: задачи с таким именем нет
+        logger.exception('Неизвестная задача %s', job.name)
+        current.update(
+            status=Task.FAILED, finished=timezone.now(),
+            error=traceback.format_exc()
+        )
+        return
+    args, kwargs = json.loads(job.arguments)
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            logger.warning(
+                'Задача %s, попытка %s из %s не удалась',
+                job.name, job.attempts, job.max_attempts, exc_info=True
+            )
+            current.update(
+                status=Task.QUEUED, error=error,
+                run_at=timezone.now() + backoff(job.attempts)
+            )
+        else:
+            logger.error(
+                'Задача %s не выполнена за %s попыток',
+                job.name, job.attempts, exc_info=True
+            )
+            current.update(
+                status=Task.FAILED, finished=timezone.now(), error=error
+            )
+        return
+    finished = timezone.now()
+    current.update(status=Task.DONE, finished=finished, error='')
+    logger.info(
+        'Задача %s: ожидание %.3f с, выполнение %.3f с', job.name,
+        (job.started - job.run_at).total_seconds(),
+        (finished - job.started).total_seconds()
+    )
+
+
+def run_pending(limit=100):
+    """Выполняет готовые задачи в текущем потоке, пока они есть."""
+    total = 0
+    while True:
+        jobs = claim(limit)
+        if not jobs:
+            return total
+        for job in jobs:
+            execute(job)
+        total += len(jobs)
+
+
+def purge():
+    """Удаляет выполненные задачи старше KEEP_DONE."""
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, finished__lt=timezone.now() - KEEP_DONE
+    ).delete()
+    return deleted
+
+
+def stats():
+    """Размер очереди и задержки последних STATS_SAMPLE задач.
+
+    wait - время от срока выполнения до начала работы, то есть
+    задержка очереди; total - от постановки до завершения.
+    """
+    counts = dict(
+        Task.objects.values_list('status').annotate(Count('pk'))
+        .order_by()
+    )
+    result = {status: counts.get(status, 0) for status, _ in Task.STATUSES}
+    oldest = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=timezone.now()
+    ).order_by('run_at').values_list('run_at', flat=True).first()
+    result['oldest_due'] = (
+        (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    )
+    recent = Task.objects.filter(status=Task.DONE).order_by(
+        '-finished'
+    ).values_list('created', 'run_at', 'started', 'finished')[:STATS_SAMPLE]
+    waits, totals = [], []
+    for created, run_at, started, finished in recent:
+        waits.append((started - run_at).total_seconds())
+        totals.append((finished - created).total_seconds())
+    for label, values in (('wait', waits), ('total', totals)):
+        values.sort()
+        result[label] = {
+            'avg': sum(values) / len(values) if values else 0.0,
+            'p95': values[int(len(values) * 0.95)] if values else 0.0,
+            'max': values[-1] if values else 0.0,
+        }
+    return result
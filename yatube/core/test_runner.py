@@ -0,0 +1,34 @@
+"""Запуск тестов с кешем во временном файле.
+
+Тесты очищают кеш, а в настройках он лежит в файле рядом с проектом
+и общий с запущенным сервером. Раннер подменяет файл временным
+и удаляет его после прогона.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TempCacheRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.mkdtemp(prefix='yatube-cache-')
+        caches = {
+            alias: dict(
+                config,
+                LOCATION=os.path.join(self.cache_directory, f'{alias}.sqlite3')
+            )
+            for alias, config in settings.CACHES.items()
+        }
+        self.cache_settings = override_settings(CACHES=caches)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,46 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
 
 from http import HTTPStatus
 
+from core import db_router, tasks
+from core.cache import cache_feed
+from core.management.commands.sqlite_maintenance import (
+    Command as MaintenanceCommand
+)
+from core.management.commands.sync_replicas import copy_sqlite
+from core.middleware import StickyPrimaryMiddleware
+from core.models import Task
+from core.sqlite_backend import PRODUCTION_OPTIONS
+from core.sqlite_backend.base import DatabaseWrapper
+from core.sqlite_cache import SQLiteCache
+from posts.models import Post
+
+CALLS = []
+
+
+@tasks.task(max_attempts=2)
+def remember(value):
+    """Тестовая задача: запоминает значение, на 'fail' падает."""
+    CALLS.append(value)
+    if value == 'fail':
+        raise ValueError(value)
+
 
 class ViewTestClass(TestCase):
     def test_error_page(self):
@@ -10,3 +49,279 @@ class ViewTestClass(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NotFound)
         # Проверяем, что используется шаблон core/404.html
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTest(TestCase):
+    """Общий кеш в файле SQLite."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'),
+            {'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Запись, чтение, add, incr и удаление."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_many_and_expiry(self):
+        """Пакетные операции и истечение срока жизни."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.set('expired', 3, timeout=-1)
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'expired', 'missing']),
+            {'a': 1, 'b': 2}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно читавшиеся ключи."""
+        for i in range(4):
+            self.cache.set(f'key{i}', i)
+        self.cache._connection().execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%key0'"
+            " OR key LIKE '%key1'"
+        )
+        self.cache.set('key4', 4)
+        self.assertIsNone(self.cache.get('key0'))
+        self.assertEqual(self.cache.get('key4'), 4)
+
+    def test_entry_count_without_scans(self):
+        """Счетчик записей точен, а запись не считает таблицу."""
+        statements = []
+        self.cache._connection().set_trace_callback(statements.append)
+        self.cache.set('a', 1)
+        self.cache.set('a', 2)
+        self.cache.set_many({'b': 1, 'c': 2})
+        self.cache.delete('b')
+        self.assertFalse([sql for sql in statements if 'COUNT' in sql])
+        connection = self.cache._connection()
+        self.assertEqual(self.cache._count(connection), 2)
+        self.cache.clear()
+        self.assertEqual(self.cache._count(connection), 0)
+
+    def test_shared_between_instances(self):
+        """Экземпляры с одним файлом видят общие данные."""
+        other = SQLiteCache(self.cache._path, {})
+        self.cache.set('shared', 'value')
+        self.assertEqual(other.get('shared'), 'value')
+
+
+class TimingMiddlewareTest(TestCase):
+    """Метрики запроса в заголовке Server-Timing."""
+
+    def test_server_timing_header(self):
+        """Ответ содержит время БД, шаблонов и обращения к кешу."""
+        response = self.client.get('/about/author/')
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    def test_slow_requests_log(self):
+        """Самые медленные запросы сохраняются в файл."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        slow_log = os.path.join(directory, 'slow.jsonl')
+        with self.settings(TIMING_SLOW_LOG=slow_log, TIMING_SLOWEST=1):
+            self.client.get('/about/author/')
+        with open(slow_log) as log:
+            record = json.loads(log.readline())
+        self.assertEqual(record['path'], '/about/author/')
+        self.assertIn('queries', record)
+
+
+def record_alias(request):
+    return HttpResponse(db_router.ReplicaRouter().db_for_read(Post) or '')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTest(TestCase):
+    """Чтение с реплик и закрепление за основной базой."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = db_router.read_replica(record_alias)
+
+    def test_reads_go_to_replica(self):
+        """GET читает с реплики, запись и прочие методы - с основной."""
+        router = db_router.ReplicaRouter()
+        response = self.view(self.factory.get('/'))
+        self.assertIn(response.content.decode(), ('replica1', 'replica2'))
+        self.assertEqual(self.view(self.factory.post('/')).content, b'')
+        with db_router.use_replica('replica1'):
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Session), 'default')
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+    def test_cached_pages_rendered_from_primary(self):
+        """Промах cache_feed читает основную базу, а не реплику."""
+        cache.clear()
+        view = db_router.read_replica(cache_feed('replicas')(record_alias))
+        self.assertEqual(view(self.factory.get('/')).content, b'')
+
+    def test_sticky_primary_after_write(self):
+        """После записи пользователь читает из основной базы."""
+        middleware = StickyPrimaryMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.post('/'))
+        cookie = response.cookies[db_router.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        self.assertNotIn(
+            db_router.STICKY_COOKIE,
+            middleware(self.factory.get('/')).cookies
+        )
+        request = self.factory.get('/')
+        request.COOKIES[db_router.STICKY_COOKIE] = cookie.value
+        self.assertEqual(self.view(request).content, b'')
+
+    def test_sync_replicas(self):
+        """Реплика-файл получает данные основной базы."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, 'primary.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with closing(sqlite3.connect(source)) as connection:
+            connection.execute('CREATE TABLE t (x)')
+            connection.execute('INSERT INTO t VALUES (1)')
+            connection.commit()
+        copy_sqlite(source, target)
+        with closing(sqlite3.connect(target)) as connection:
+            rows = connection.execute('SELECT x FROM t').fetchall()
+        self.assertEqual(rows, [(1,)])
+
+
+class SQLiteBackendTest(TestCase):
+    """Прагмы соединения, BEGIN IMMEDIATE и обслуживание базы."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.name = os.path.join(directory, 'db.sqlite3')
+        settings_dict = dict(
+            connections['default'].settings_dict,
+            NAME=self.name, OPTIONS=PRODUCTION_OPTIONS
+        )
+        self.wrapper = DatabaseWrapper(settings_dict)
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('mmap_size'), 268435456)
+
+    def test_transaction_takes_write_lock(self):
+        """Транзакция сразу блокирует запись для других соединений."""
+        self.wrapper.ensure_connection()
+        self.wrapper._start_transaction_under_autocommit()
+        self.addCleanup(self.wrapper.connection.rollback)
+        with closing(sqlite3.connect(self.name, timeout=0)) as other:
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'locked'
+            ):
+                other.execute('BEGIN IMMEDIATE')
+
+    def test_maintenance(self):
+        """Инкрементальный VACUUM возвращает свободные страницы."""
+        out = StringIO()
+        command = MaintenanceCommand(stdout=out)
+        command.enable_incremental_vacuum(self.wrapper)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x)')
+            cursor.executemany(
+                'INSERT INTO t VALUES (?)', [('x' * 1000,)] * 100
+            )
+            cursor.execute('DELETE FROM t')
+        self.assertGreater(self.pragma('freelist_count'), 0)
+        command.maintain(self.wrapper, vacuum_pages=1000)
+        self.assertEqual(self.pragma('freelist_count'), 0)
+        self.assertIn('ANALYZE', out.getvalue())
+
+
+class TaskQueueTest(TestCase):
+    """Фоновые задачи: постановка, повторы и возврат брошенных задач."""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_with_transaction(self):
+        """Задача из откаченной транзакции не выполняется."""
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                remember.delay('rolled back')
+                raise ValueError
+        job = remember.delay('committed')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(CALLS, ['committed'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача повторяется позже, затем помечается неудачной."""
+        job = remember.delay('fail')
+        started = timezone.now()
+        with self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertGreaterEqual(job.run_at, started + tasks.BACKOFF / 2)
+        self.assertIn('ValueError', job.error)
+        # Раньше срока задача не забирается
+        self.assertEqual(tasks.run_pending(), 0)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(CALLS, ['fail', 'fail'])
+
+    def test_abandoned_task_reclaimed(self):
+        """Задача, чей воркер пропал, возвращается в работу через LEASE."""
+        job = remember.delay('slow')
+        self.assertEqual(len(tasks.claim(10)), 1)
+        self.assertEqual(tasks.claim(10), [])
+        Task.objects.update(
+            started=timezone.now() - tasks.LEASE - timedelta(seconds=1)
+        )
+        [reclaimed] = tasks.claim(10)
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertEqual(reclaimed.attempts, 2)
+
+    def test_unknown_task_not_retried(self):
+        job = tasks.enqueue('core.tests.CALLS')
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_stats(self):
+        remember.delay('done')
+        tasks.run_pending()
+        remember.delay('waiting')
+        out = StringIO()
+        call_command('run_tasks', '--stats', stdout=out)
+        self.assertIn('В очереди: 1', out.getvalue())
+        self.assertIn('Выполнена: 1', out.getvalue())
+        self.assertIn('Ожидание: в среднем', out.getvalue())
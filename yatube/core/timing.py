@@ -0,0 +1,86 @@
+"""Сбор метрик текущего запроса: БД, шаблоны, кеш.
+
+Метрики копятся в thread-local хранилище, которое открывает
+core.middleware.TimingMiddleware. Вне запроса запись метрик ничего
+не делает, поэтому фоновые потоки и команды ее не замечают.
+"""
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+_local = threading.local()
+
+
+class RequestStats:
+    __slots__ = (
+        'queries', 'db_time', 'template_time', 'cache_hits', 'cache_misses'
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def record_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обертка для connection.execute_wrapper: время и число запросов."""
+    stats = current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который замеряет время рендеринга.
+
+    Замеряется только рендеринг шаблона верхнего уровня, поэтому
+    время вложенных include не учитывается дважды.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
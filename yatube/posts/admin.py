@@ -1,9 +1,15 @@
 from django.contrib import admin
 
+from . import search
+from .forms import PostForm
 from .models import Comment, Follow, Group, Post
 
 
 class PostAdmin(admin.ModelAdmin):
+    # Картинки из админки принимаются так же, как с сайта:
+    # с ограничениями, перекодированием и дедупликацией
+    form = PostForm
+    fields = ('text', 'author', 'group', 'image')
     list_display = (
         'pk',
         'text',
@@ -17,6 +23,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идет через полнотекстовый индекс,
+        # а не через LIKE по всей таблице постов
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,57 @@
+"""Помощники для массовой загрузки данных через bulk_create.
+
+bulk_create не отправляет сигналы, поэтому после загрузки ленты,
+счетчики, сводки групп, поисковый индекс и популярное пересобираются
+целиком.
+"""
+import gzip
+import itertools
+import sys
+from contextlib import contextmanager, nullcontext
+
+from django.core.cache import cache
+from django.db import transaction
+
+from posts import counters, group_stats, search, timeline, trending
+
+
+@contextmanager
+def manual_pub_date(*models):
+    """Позволяет задать pub_date вручную, отключив auto_now_add."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def chunked(iterable, size):
+    """Разбивает поток на списки по size элементов."""
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def rebuild_derived():
+    """Пересобирает ленты, счетчики, сводки, поиск и популярное."""
+    with transaction.atomic():
+        timeline.rebuild()
+        counters.reconcile()
+        group_stats.rebuild()
+        search.reindex()
+        trending.rerank()
+    cache.clear()
+
+
+def open_stream(path, mode):
+    """Открывает файл выгрузки: '-' - стандартный поток, .gz - сжатие."""
+    if path == '-':
+        return nullcontext(sys.stdout if mode == 'w' else sys.stdin)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
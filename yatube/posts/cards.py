@@ -0,0 +1,59 @@
+"""Кеш отрисованных карточек постов в лентах.
+
+Ключ карточки содержит id и версию поста, поэтому правка поста
+сбрасывает только его карточку. В ключ входит и отпечаток имени
+автора и группы, которые выводит карточка: после переименования
+ключи меняются сами. Карточки страницы читаются из кеша одним
+get_many, отрисовываются только промахи.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.cache import FEED_CACHE_TIMEOUT
+
+LIST_CARD = 'posts/includes/post_list.html'
+PROFILE_CARD = 'posts/includes/profile_post.html'
+GROUP_CARD = 'posts/includes/group_post.html'
+CARD_KEY = 'card:{}:{}:{}:{}'
+# Связанные объекты, которые выводит карточка, и их выводимые поля.
+# Views загружают эти связи через select_related
+CARD_RELATIONS = {
+    LIST_CARD: ('author',),
+    PROFILE_CARD: ('author', 'group'),
+    GROUP_CARD: ('author',),
+}
+SHOWN_FIELDS = {
+    'author': ('username', 'first_name', 'last_name'),
+    'group': ('slug', 'title'),
+}
+
+
+def card_key(post, template):
+    shown = []
+    for relation in CARD_RELATIONS[template]:
+        related = getattr(post, relation)
+        shown.extend(
+            str(getattr(related, field)) if related else ''
+            for field in SHOWN_FIELDS[relation]
+        )
+    digest = hashlib.md5('\0'.join(shown).encode()).hexdigest()[:16]
+    return CARD_KEY.format(template, post.pk, post.version, digest)
+
+
+def attach(posts, template=LIST_CARD):
+    """Добавляет постам атрибут card с HTML карточки."""
+    posts = list(posts)
+    keys = {card_key(post, template): post for post in posts}
+    cached = cache.get_many(keys)
+    rendered = {}
+    for key, post in keys.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(template, {'post': post})
+        post.card = mark_safe(html)
+    if rendered:
+        cache.set_many(rendered, FEED_CACHE_TIMEOUT)
+    return posts
@@ -0,0 +1,97 @@
+"""Денормализованные счетчики постов, подписчиков и комментариев."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def recount(user_id):
+    """Пересчитывает счетчики пользователя агрегатными запросами."""
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': (
+                Follow.objects.filter(author_id=user_id).count()
+            ),
+            'following_count': Follow.objects.filter(user_id=user_id).count(),
+        }
+    )
+    return stats
+
+
+def get_stats(user):
+    """Счетчики пользователя, при отсутствии строки - пересчитанные."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def bump(user_id, field, delta):
+    """Атомарно изменяет счетчик пользователя на delta.
+
+    Для пользователя без строки счетчиков при увеличении она создается
+    пересчетом, при уменьшении ничего не делается: пользователь может
+    удаляться вместе со своими постами.
+    """
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    if not stats.update(**{field: F(field) + delta}) and delta > 0:
+        recount(user_id)
+
+
+def bump_comments(post_id, delta):
+    """Атомарно изменяет счетчик комментариев поста на delta."""
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def reconcile():
+    """Исправляет расхождения всех счетчиков, возвращает число правок."""
+    # Без order_by() в GROUP BY попал бы pub_date из сортировки
+    # модели, и подзапрос вернул бы число комментариев одной даты
+    comments = (
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    fixed = Post.objects.exclude(
+        comments_count=Coalesce(Subquery(comments), 0)
+    ).update(comments_count=Coalesce(Subquery(comments), 0))
+
+    actual = {}
+    counts = (
+        ('posts_count', Post.objects.values_list('author_id')),
+        ('followers_count', Follow.objects.values_list('author_id')),
+        ('following_count', Follow.objects.values_list('user_id')),
+    )
+    for field, queryset in counts:
+        for user_id, total in queryset.annotate(total=Count('pk')).order_by():
+            actual.setdefault(user_id, dict.fromkeys(STATS_FIELDS, 0))
+            actual[user_id][field] = total
+
+    changed = []
+    for stats in UserStats.objects.iterator():
+        values = actual.pop(stats.user_id, dict.fromkeys(STATS_FIELDS, 0))
+        if any(getattr(stats, f) != values[f] for f in STATS_FIELDS):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    UserStats.objects.bulk_update(changed, STATS_FIELDS, BATCH_SIZE)
+
+    # bulk_update сам ограничивает пачку лимитом бэкенда, а явный
+    # batch_size у bulk_create в Django 2.2 не ограничивается
+    created = UserStats.objects.bulk_create([
+        UserStats(user_id=user_id, **values)
+        for user_id, values in actual.items()
+    ])
+    return fixed + len(changed) + len(created)
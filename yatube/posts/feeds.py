@@ -0,0 +1,193 @@
+"""Ленты RSS, Atom и JSON Feed для сайта, групп и авторов.
+
+Ленты пишутся потоком прямо из итератора по последним постам, без
+шаблонов и без создания моделей. Готовый документ сохраняется в кеше
+под текущим поколением ленты, поэтому живет, пока не изменится
+какой-нибудь из его постов. Поколение служит и ETag-ом.
+"""
+import hashlib
+import json
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag
+)
+from django.utils.text import Truncator
+
+from core.cache import FEED_CACHE_TIMEOUT, get_generation
+
+FEED_LENGTH = 50
+# Прокси и клиенты могут держать ленту у себя, а потом
+# перепроверять ее по ETag
+FEED_MAX_AGE = 60 * 5
+# Ссылки в документе абсолютные, поэтому ключ учитывает схему и хост
+FEED_KEY = 'feed:{}:{}:{}:{}'
+TITLE_WORDS = 10
+FIELDS = (
+    'pk', 'text', 'pub_date', 'updated', 'author__username',
+    'author__first_name', 'author__last_name', 'group__title'
+)
+
+
+class Feed:
+    """Описание ленты: заголовок, адреса и посты."""
+
+    def __init__(self, request, title, link, posts):
+        self.request = request
+        self.title = title
+        self.link = request.build_absolute_uri(link)
+        self.self_link = request.build_absolute_uri()
+        self.updated = timezone.now()
+        self.posts = posts.order_by('-pub_date', '-pk').values(*FIELDS)
+
+    def items(self):
+        for post in self.posts[:FEED_LENGTH].iterator():
+            author = ' '.join(filter(None, (
+                post['author__first_name'], post['author__last_name']
+            )))
+            post['author'] = author or post['author__username']
+            post['title'] = Truncator(post['text']).words(TITLE_WORDS)
+            post['url'] = self.request.build_absolute_uri(
+                reverse('posts:post_detail', args=(post['pk'],))
+            )
+            yield post
+
+
+def rss(feed):
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+        f'<title>{escape(feed.title)}</title>'
+        f'<link>{escape(feed.link)}</link>'
+        f'<description>{escape(feed.title)}</description>'
+        f'<atom:link href={quoteattr(feed.self_link)} rel="self"/>'
+        '<language>ru</language>'
+        f'<lastBuildDate>{format_datetime(feed.updated)}</lastBuildDate>'
+    )
+    for item in feed.items():
+        group = item['group__title']
+        yield (
+            '<item>'
+            f'<title>{escape(item["title"])}</title>'
+            f'<link>{escape(item["url"])}</link>'
+            f'<guid isPermaLink="true">{escape(item["url"])}</guid>'
+            f'<description>{escape(item["text"])}</description>'
+            f'<dc:creator>{escape(item["author"])}</dc:creator>'
+            f'<pubDate>{format_datetime(item["pub_date"])}</pubDate>'
+            + (f'<category>{escape(group)}</category>' if group else '')
+            + '</item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def atom(feed):
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ru">'
+        f'<title>{escape(feed.title)}</title>'
+        f'<link href={quoteattr(feed.link)} rel="alternate"/>'
+        f'<link href={quoteattr(feed.self_link)} rel="self"/>'
+        f'<id>{escape(feed.link)}</id>'
+        f'<updated>{feed.updated.isoformat()}</updated>'
+    )
+    for item in feed.items():
+        group = item['group__title']
+        yield (
+            '<entry>'
+            f'<title>{escape(item["title"])}</title>'
+            f'<link href={quoteattr(item["url"])} rel="alternate"/>'
+            f'<id>{escape(item["url"])}</id>'
+            f'<published>{item["pub_date"].isoformat()}</published>'
+            f'<updated>{item["updated"].isoformat()}</updated>'
+            f'<author><name>{escape(item["author"])}</name></author>'
+            + (f'<category term={quoteattr(group)}/>' if group else '')
+            + f'<content type="text">{escape(item["text"])}</content>'
+            '</entry>'
+        )
+    yield '</feed>\n'
+
+
+def json_feed(feed):
+    header = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': feed.title,
+        'home_page_url': feed.link,
+        'feed_url': feed.self_link,
+        'language': 'ru',
+    }, ensure_ascii=False)
+    # Массив постов дописывается потоком внутрь готового объекта
+    yield header[:-1] + ', "items": ['
+    separator = ''
+    for item in feed.items():
+        entry = {
+            'id': item['url'],
+            'url': item['url'],
+            'title': item['title'],
+            'content_text': item['text'],
+            'date_published': item['pub_date'].isoformat(),
+            'date_modified': item['updated'].isoformat(),
+            'authors': [{'name': item['author']}],
+        }
+        if item['group__title']:
+            entry['tags'] = [item['group__title']]
+        yield separator + json.dumps(entry, ensure_ascii=False)
+        separator = ', '
+    yield ']}\n'
+
+
+FORMATS = {
+    'rss': (rss, 'application/rss+xml; charset=utf-8'),
+    'atom': (atom, 'application/atom+xml; charset=utf-8'),
+    'json': (json_feed, 'application/feed+json; charset=utf-8'),
+}
+
+
+def _caching(chunks, key):
+    """Отдает части документа и кеширует его, если он дописан до конца."""
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(body), FEED_CACHE_TIMEOUT)
+
+
+def _origin(request):
+    origin = f'{request.scheme}://{request.get_host()}'
+    return hashlib.md5(origin.encode()).hexdigest()[:16]
+
+
+def respond(request, kind, name, source):
+    """Ответ с лентой kind для ленты name.
+
+    source - функция без аргументов, возвращающая заголовок, адрес
+    страницы и посты ленты. Она вызывается, только если документа
+    нет в кеше, поэтому 304 и повторные запросы не трогают базу.
+    """
+    if kind not in FORMATS:
+        raise Http404(f'Неизвестный формат ленты: {kind}')
+    writer, content_type = FORMATS[kind]
+    generation = get_generation(name)
+    origin = _origin(request)
+    etag = quote_etag(f'{kind}-{generation}-{origin}')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = FEED_KEY.format(name, generation, kind, origin)
+        body = cache.get(key)
+        if body is not None:
+            response = HttpResponse(body, content_type=content_type)
+        else:
+            feed = Feed(request, *source())
+            response = StreamingHttpResponse(
+                _caching(writer(feed), key), content_type=content_type
+            )
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=FEED_MAX_AGE)
+    return response
@@ -0,0 +1,54 @@
+"""Граф подписок: проверки "подписан ли" без запросов и счетчики.
+
+Множество авторов, на которых подписан пользователь, хранится
+в кеше одной записью и собирается одним запросом по индексу при
+промахе. Проверка читает и распаковывает это множество целиком,
+то есть стоит O(числа подписок), зато не обращается к базе.
+Подписка и отписка сбрасывают запись подписчика. Число подписчиков
+и подписок берется из денормализованных счетчиков за O(1).
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from posts.counters import get_stats
+from posts.models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан user."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = FOLLOWING_KEY.format(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, ids, FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def is_following(user, author):
+    return author.pk in following_ids(user)
+
+
+def counts(user):
+    """Число подписчиков и подписок пользователя."""
+    stats = get_stats(user)
+    return stats.followers_count, stats.following_count
+
+
+def forget(user_id):
+    """Сбрасывает подписки пользователя сразу и после фиксации.
+
+    Второй сброс убирает множество, которое параллельный запрос
+    мог собрать до фиксации подписки.
+    """
+    key = FOLLOWING_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
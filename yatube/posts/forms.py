@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -7,12 +9,17 @@ class PostForm(forms.ModelForm):
     """Форма добавляет пост.
 
     Пост содержит текст, картинку и название
-    группы в которой пост публикуется.
+    группы в которой пост публикуется. Новая картинка
+    перекодируется при проверке формы, а в хранилище под именем
+    по ее содержимому попадает только при сохранении поста.
     """
 
+    prepared_image = None
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': images.ImageUploadField}
         help_texts = {
             'text': 'Текст поста',
             'group': 'Группа',
@@ -24,6 +31,19 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка, которая будет добавлена к посту'
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            self.prepared_image = images.prepare(image)
+        return image
+
+    def save(self, commit=True):
+        # Отклоненная форма не оставляет файлов в хранилище: картинка
+        # записывается, только когда все поля прошли проверку
+        if self.prepared_image is not None:
+            self.instance.image = images.store(*self.prepared_image)
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     """Форма добавляет комментарий к посту."""
@@ -0,0 +1,70 @@
+"""Имена лент, кешируемых с инвалидацией по поколениям."""
+import hashlib
+
+from core.cache import bump_generation
+
+from posts.models import Group, Post, User
+
+INDEX = 'index'
+GROUPS = 'groups'
+
+
+def _digest(value):
+    # Имя ленты входит в ключи кеша, а они должны быть ASCII:
+    # slug и username могут быть кириллическими
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def group(slug):
+    return f'group:{_digest(slug)}'
+
+
+def profile(username):
+    return f'profile:{_digest(username)}'
+
+
+def invalidate_post(post, group_ids=()):
+    """Сбрасывает ленты, в которых показывается пост."""
+    group_ids = {pk for pk in (post.group_id, *group_ids) if pk}
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    )
+    username = User.objects.filter(pk=post.author_id).values_list(
+        'username', flat=True
+    ).first()
+    bump_generation(
+        INDEX,
+        profile(username),
+        *(group(slug) for slug in slugs),
+        *((GROUPS,) if group_ids else ())
+    )
+
+
+def invalidate_author(author_id, *usernames):
+    """Сбрасывает ленты с постами автора после смены его имени.
+
+    usernames - прежний и новый username: профиль доступен по обоим.
+    Каталог групп тоже сбрасывается: в нем показаны лучшие авторы.
+    """
+    slugs = list(Post.objects.filter(
+        author_id=author_id, group__isnull=False
+    ).values_list('group__slug', flat=True).distinct())
+    bump_generation(
+        INDEX,
+        *(profile(username) for username in set(usernames)),
+        *(group(slug) for slug in slugs),
+        *((GROUPS,) if slugs else ())
+    )
+
+
+def invalidate_group(slugs, usernames=()):
+    """Сбрасывает страницы группы, каталог, главную и профили авторов.
+
+    slugs - прежний и новый slug, usernames - авторы постов группы.
+    """
+    bump_generation(
+        INDEX,
+        GROUPS,
+        *(group(slug) for slug in set(slugs)),
+        *(profile(username) for username in usernames)
+    )
@@ -0,0 +1,122 @@
+"""Сводки групп для каталога: число постов, последний пост и авторы.
+
+Сводка меняется вместе с постами группы: счетчики сдвигаются
+атомарно, дата последнего поста и лучшие авторы берутся запросами
+по индексам, без агрегатов по всем постам группы.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, DateTimeField, F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from posts.models import Group, GroupAuthorStats, GroupStats, Post
+
+TOP_AUTHORS = 3
+
+
+def _bump_author(group_id, author_id, delta):
+    stats = GroupAuthorStats.objects.filter(
+        group_id=group_id, author_id=author_id
+    )
+    if not stats.update(
+        posts_count=Greatest(F('posts_count') + delta, 0)
+    ) and delta > 0:
+        _, created = GroupAuthorStats.objects.get_or_create(
+            group_id=group_id, author_id=author_id,
+            defaults={'posts_count': delta}
+        )
+        if not created:
+            # Строку успела вставить параллельная транзакция:
+            # get_or_create вернул ее без нашего приращения
+            stats.update(posts_count=F('posts_count') + delta)
+
+
+def _top_authors(group_id):
+    return ','.join(
+        str(pk) for pk in GroupAuthorStats.objects.filter(
+            group_id=group_id, posts_count__gt=0
+        ).order_by('-posts_count', 'author_id').values_list(
+            'author_id', flat=True
+        )[:TOP_AUTHORS]
+    )
+
+
+def post_added(group_id, author_id, pub_date):
+    """Учитывает пост, появившийся в группе: новый или перенесенный."""
+    _bump_author(group_id, author_id, 1)
+    date = Value(pub_date, output_field=DateTimeField())
+    GroupStats.objects.get_or_create(group_id=group_id)
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=F('posts_count') + 1,
+        last_post_date=Greatest(Coalesce('last_post_date', date), date),
+        top_authors=_top_authors(group_id),
+    )
+
+
+def post_removed(group_id, author_id):
+    """Учитывает пост, ушедший из группы: удаленный или перенесенный."""
+    _bump_author(group_id, author_id, -1)
+    # Последний пост - первая строка индекса (group, -pub_date, -id)
+    last = Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('pub_date', flat=True).first()
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=Greatest(F('posts_count') - 1, 0),
+        last_post_date=last,
+        top_authors=_top_authors(group_id),
+    )
+
+
+def post_saved(post, old_group_id):
+    """Учитывает созданный пост или его перенос в другую группу."""
+    if old_group_id == post.group_id:
+        return
+    if old_group_id:
+        post_removed(old_group_id, post.author_id)
+    if post.group_id:
+        post_added(post.group_id, post.author_id, post.pub_date)
+
+
+def rebuild():
+    """Пересобирает сводки всех групп агрегатными запросами."""
+    per_author = list(
+        Post.objects.filter(group__isnull=False)
+        .values_list('group_id', 'author_id')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    GroupAuthorStats.objects.all().delete()
+    GroupAuthorStats.objects.bulk_create(
+        (
+            GroupAuthorStats(
+                group_id=group_id, author_id=author_id, posts_count=total
+            )
+            for group_id, author_id, total in per_author
+        )
+    )
+    authors = defaultdict(list)
+    for group_id, author_id, total in per_author:
+        authors[group_id].append((-total, author_id))
+    totals = {
+        group_id: (total, last)
+        for group_id, total, last in Post.objects.filter(
+            group__isnull=False
+        ).values_list('group_id').annotate(
+            total=Count('pk'), last=Max('pub_date')
+        ).order_by()
+    }
+    GroupStats.objects.all().delete()
+    GroupStats.objects.bulk_create(
+        (
+            GroupStats(
+                group_id=group_id,
+                posts_count=totals.get(group_id, (0, None))[0],
+                last_post_date=totals.get(group_id, (0, None))[1],
+                top_authors=','.join(
+                    str(author_id) for _, author_id
+                    in sorted(authors[group_id])[:TOP_AUTHORS]
+                ),
+            )
+            for group_id in Group.objects.values_list('pk', flat=True)
+        )
+    )
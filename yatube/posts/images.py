@@ -0,0 +1,139 @@
+"""Прием картинок постов.
+
+Загрузка пишется на диск порциями, в память целиком не попадает,
+а байты сверх MAX_UPLOAD_BYTES отбрасываются. Картинка с числом
+пикселей не больше MAX_PIXELS декодируется сразу с уменьшением,
+теряет метаданные (EXIF с геометкой, ICC, комментарии) и
+пересохраняется в WebP со стороной не больше MAX_EDGE. Файл
+называется по SHA-256 загруженных байт: одинаковые картинки разных
+пользователей хранятся один раз и повторно не перекодируются.
+"""
+import hashlib
+import io
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+MAX_UPLOAD_BYTES = 10 * 2 ** 20
+MAX_PIXELS = 40 * 10 ** 6
+MAX_EDGE = 2048
+FORMAT = 'WEBP'
+EXTENSION = 'webp'
+QUALITY = 80
+UPLOAD_DIR = 'posts'
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл и не дописывает лишнее.
+
+    Байты сверх MAX_UPLOAD_BYTES отбрасываются, а у файла ставится
+    признак oversized: форма сообщит об ошибке, не читая его. Тело
+    запроса при этом дочитывается до конца: после StopUpload файл
+    не попал бы в форму, и пост сохранился бы без картинки и без
+    ошибки. Размер всего запроса ограничивает фронтовой веб-сервер.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_UPLOAD_BYTES:
+            self.oversized = True
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.oversized = self.oversized
+        return upload
+
+
+class ImageUploadField(forms.ImageField):
+    """Поле картинки с ограничениями на размер файла и число пикселей."""
+
+    def to_python(self, data):
+        if data is None:
+            return None
+        if getattr(data, 'oversized', False) or data.size > MAX_UPLOAD_BYTES:
+            raise ValidationError(
+                f'Файл больше {filesizeformat(MAX_UPLOAD_BYTES)}',
+                code='file_too_large'
+            )
+        upload = super().to_python(data)
+        # Размеры известны из заголовка, картинка еще не декодирована
+        width, height = upload.image.size
+        if width * height > MAX_PIXELS:
+            raise ValidationError(
+                f'Картинка больше {pixels_display(MAX_PIXELS)}',
+                code='too_many_pixels'
+            )
+        return upload
+
+
+def pixels_display(count):
+    """Число пикселей для сообщений: 40 мегапикселей, 0.5 мегапикселя."""
+    if count < 10 ** 6:
+        return f'{count} пикселей'
+    return f'{count / 10 ** 6:g} мегапикселей'
+
+
+def content_name(upload):
+    """Имя файла в хранилище по SHA-256 содержимого загрузки."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    value = digest.hexdigest()
+    return f'{UPLOAD_DIR}/{value[:2]}/{value}.{EXTENSION}'
+
+
+def reencode(upload):
+    """Декодирует загрузку и возвращает байты WebP без метаданных."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft('RGB', (MAX_EDGE, MAX_EDGE))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = (
+            image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info
+        )
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        image.thumbnail((MAX_EDGE, MAX_EDGE), Image.LANCZOS)
+        # Новая картинка не наследует exif, icc_profile и прочее info
+        buffer = io.BytesIO()
+        image.save(buffer, FORMAT, quality=QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def prepare(upload):
+    """Перекодирует загрузку, ничего не сохраняя в хранилище.
+
+    Возвращает имя файла и байты WebP. Если такая картинка уже
+    загружалась, вместо байт возвращается None: перекодировать ее
+    повторно не нужно.
+    """
+    name = content_name(upload)
+    if default_storage.exists(name):
+        return name, None
+    try:
+        content = reencode(upload)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать картинку', code='invalid_image'
+        )
+    return name, content
+
+
+def store(name, content):
+    """Сохраняет подготовленную картинку и возвращает имя файла."""
+    if content is None or default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(content))
@@ -0,0 +1,100 @@
+import itertools
+import random
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand
+
+SYLLABLES = 'ка ро ми ту ле на по ст вы за де ли бо ра го ко да ны'.split()
+VOCABULARY_SIZE = 50000
+BATCH_SIZE = 10000
+
+
+def make_vocabulary(rnd):
+    """Словарь синтетических слов, частоты по закону Ципфа."""
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 5))))
+    words = sorted(words)
+    rnd.shuffle(words)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск через FTS5 и LIKE на синтетической таблице '
+        'постов в памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        words, weights = make_vocabulary(rnd)
+        cum_weights = list(itertools.accumulate(weights))
+        db = sqlite3.connect(':memory:')
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)')
+        db.execute('CREATE VIRTUAL TABLE post_fts USING fts5(text)')
+
+        started = time.perf_counter()
+        for start in range(0, options['posts'], BATCH_SIZE):
+            stop = min(start + BATCH_SIZE, options['posts'])
+            rows = [
+                (pk, ' '.join(rnd.choices(
+                    words, cum_weights=cum_weights, k=rnd.randint(5, 40)
+                )))
+                for pk in range(start + 1, stop + 1)
+            ]
+            db.executemany('INSERT INTO post VALUES (?, ?)', rows)
+            db.executemany(
+                'INSERT INTO post_fts (rowid, text) VALUES (?, ?)', rows
+            )
+        db.execute("INSERT INTO post_fts (post_fts) VALUES ('optimize')")
+        self.stdout.write(
+            f'{options["posts"]} постов проиндексировано за '
+            f'{time.perf_counter() - started:.1f} с'
+        )
+
+        # Частое, среднее и редкое слово, а также пара слов
+        queries = (
+            words[0], words[100], words[10000], f'{words[10]} {words[1000]}'
+        )
+        for query in queries:
+            terms = query.split()
+            match = ' '.join(f'"{term}"' for term in terms)
+            like = ' AND '.join('text LIKE ?' for _ in terms)
+            timings = {
+                'fts5': self.measure(
+                    db,
+                    'SELECT rowid FROM post_fts WHERE post_fts MATCH ? '
+                    'ORDER BY rank LIMIT 10',
+                    [match],
+                    options['repeat']
+                ),
+                'like': self.measure(
+                    db,
+                    f'SELECT id FROM post WHERE {like} '
+                    'ORDER BY id DESC LIMIT 10',
+                    [f'%{term}%' for term in terms],
+                    options['repeat']
+                ),
+            }
+            self.stdout.write(
+                f'{query!r}: ' + ', '.join(
+                    f'{name} {seconds * 1000:.1f} мс'
+                    for name, seconds in timings.items()
+                )
+            )
+
+    @staticmethod
+    def measure(db, sql, params, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,65 @@
+import random
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+from posts.management.commands.generate_data import skewed_weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время и память расчета рекомендаций на синтетическом '
+        'графе подписок в памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        graph = suggestions.Graph.from_edges(
+            self.edges(options['users'], options['edges'], options['seed']),
+            options['users'] + 1
+        )
+        self.stdout.write(
+            f'Граф: {len(graph.indices)} подписок, '
+            f'{graph.nbytes / 2 ** 20:.1f} МиБ, '
+            f'{time.perf_counter() - started:.1f} с, '
+            f'пик памяти процесса {self.peak():.0f} МиБ'
+        )
+        started = time.perf_counter()
+        users = rows = 0
+        for _, candidates in suggestions.score(graph):
+            users += 1
+            rows += len(candidates)
+        self.stdout.write(
+            f'Пользователей с рекомендациями: {users}, строк: {rows}, '
+            f'{time.perf_counter() - started:.1f} с, '
+            f'пик памяти процесса {self.peak():.0f} МиБ'
+        )
+
+    @staticmethod
+    def peak():
+        # ru_maxrss в Linux - в КиБ
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+    def edges(self, users, total, seed):
+        """Подписки с перекосом, как у generate_data, по порядку строк."""
+        rnd = random.Random(seed)
+        weights = skewed_weights(users)
+        authors = range(1, users + 1)
+        per_user = total / users
+        for user in authors:
+            count = min(int(rnd.expovariate(1 / per_user)), users - 1)
+            chosen = set()
+            while len(chosen) < count:
+                chosen.update(rnd.choices(
+                    authors, cum_weights=weights, k=count - len(chosen)
+                ))
+                chosen.discard(user)
+            for author in sorted(chosen):
+                yield user, author
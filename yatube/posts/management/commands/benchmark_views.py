@@ -0,0 +1,189 @@
+import json
+import random
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Group, Post, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    return ordered[round(rank / 100 * (len(ordered) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон лент и страниц постов через тестовый клиент: '
+        'задержки p50/p95/p99, запросы к БД и пропускная способность'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Число запросов на каждую страницу'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='')
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON-файл'
+        )
+        parser.add_argument(
+            '--compare', help='JSON-файл прошлого прогона для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        reader = (
+            User.objects.filter(pk__in=Follow.objects.values('user'))
+            .order_by('?').first()
+        )
+        self.client = Client()
+        if reader is not None:
+            self.client.force_login(reader)
+
+        results = {}
+        for name, urls in self.scenarios().items():
+            urls = urls(options['requests'])
+            if not urls:
+                self.stdout.write(f'{name}: нет данных, пропущено')
+                continue
+            results[name] = self.run(urls, options['cold'])
+            self.report(name, results[name])
+
+        run = {
+            'label': options['label'],
+            'started': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'results': results,
+        }
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.compare(json.load(previous), run)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(run, output, ensure_ascii=False, indent=2)
+
+    def scenarios(self):
+        return {
+            'index': self.index_urls,
+            'group_posts': self.group_urls,
+            'profile': self.profile_urls,
+            'post_detail': self.post_detail_urls,
+            'follow_index': self.follow_urls,
+            'index_feed': self.feed_urls,
+        }
+
+    def run(self, urls, cold):
+        latencies = []
+        queries = []
+        started = time.perf_counter()
+        for url in urls:
+            if cold:
+                cache.clear()
+            # Запросы считаются до конца тела ответа: потоковые ленты
+            # читают базу уже после того, как посчитан Server-Timing
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                request_started = time.perf_counter()
+                response = self.client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(sum(len(context) for context in captured))
+        elapsed = time.perf_counter() - started
+        result = {
+            f'p{rank}_ms': round(percentile(latencies, rank) * 1000, 2)
+            for rank in PERCENTILES
+        }
+        result['queries'] = round(sum(queries) / len(queries), 2)
+        result['rps'] = round(len(urls) / elapsed, 1)
+        return result
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<13} ' + ' '.join(
+                f'{key}={value}' for key, value in result.items()
+            )
+        )
+
+    def compare(self, previous, current):
+        self.stdout.write(f'Сравнение с прогоном {previous["label"]!r}:')
+        for name, result in current['results'].items():
+            before = previous['results'].get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f'{name:<13} ' + ' '.join(
+                    f'{key} {before[key]} -> {value}'
+                    for key, value in result.items() if key in before
+                )
+            )
+
+    def sample(self, queryset, total):
+        ids = list(queryset.order_by('?')[:total])
+        return [self.rnd.choice(ids) for _ in range(total)] if ids else []
+
+    def index_urls(self, total):
+        return self.paged(reverse('posts:index'), total)
+
+    def group_urls(self, total):
+        return [
+            reverse('posts:group_list', kwargs={'slug': slug})
+            for slug in self.sample(
+                Group.objects.values_list('slug', flat=True), total
+            )
+        ]
+
+    def profile_urls(self, total):
+        return [
+            reverse('posts:profile', kwargs={'username': username})
+            for username in self.sample(
+                Post.objects.values_list('author__username', flat=True),
+                total
+            )
+        ]
+
+    def post_detail_urls(self, total):
+        return [
+            reverse('posts:post_detail', kwargs={'post_id': pk})
+            for pk in self.sample(
+                Post.objects.values_list('pk', flat=True), total
+            )
+        ]
+
+    def follow_urls(self, total):
+        if not Follow.objects.exists():
+            return []
+        return self.paged(reverse('posts:follow_index'), total)
+
+    def feed_urls(self, total):
+        return [
+            reverse('posts:index_feed', kwargs={'kind': kind})
+            for kind in self.rnd.choices(('rss', 'atom', 'json'), k=total)
+        ]
+
+    def paged(self, url, total):
+        """Первые страницы ленты и немного старых ссылок ?page=."""
+        return [
+            url if self.rnd.random() < 0.8
+            else f'{url}?page={self.rnd.randint(2, 50)}'
+            for _ in range(total)
+        ]
@@ -0,0 +1,37 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации "на кого подписаться" по всему '
+        'графу подписок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=suggestions.SUGGESTIONS_PER_USER,
+            help='Сколько рекомендаций сохранить для пользователя'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        graph = suggestions.load_graph()
+        loaded = time.perf_counter()
+        self.stdout.write(
+            f'Граф: {len(graph.indices)} подписок, '
+            f'{graph.nbytes / 2 ** 20:.1f} МиБ, {loaded - started:.1f} с'
+        )
+        total = suggestions.store(
+            suggestions.score(graph, options['limit'])
+        )
+        # ru_maxrss в Linux - в КиБ
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {total} за {time.perf_counter() - loaded:.1f} с, '
+            f'пик памяти процесса {peak:.0f} МиБ'
+        ))
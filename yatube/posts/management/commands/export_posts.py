@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.bulk import chunked, open_stream
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает пользователей, группы, посты, комментарии '
+        'и подписки в JSONL (по записи на строку)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл выгрузки, .gz сжимается; - для stdout'
+        )
+        parser.add_argument(
+            '--media', help='Каталог, куда скопировать картинки постов'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков копирования картинок'
+        )
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.media = options['media']
+        self.missing = 0
+        total = 0
+        with open_stream(options['path'], 'w') as stream, \
+                ThreadPoolExecutor(options['workers']) as self.pool:
+            for record in self.records():
+                stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+                total += 1
+        if self.missing:
+            self.stderr.write(f'Не найдено картинок: {self.missing}')
+        self.stderr.write(f'Выгружено записей: {total}')
+
+    def rows(self, queryset, *fields):
+        # values() и iterator() читают курсор порциями, не создавая
+        # моделей и не складывая весь результат в память
+        return queryset.order_by('pk').values(*fields).iterator(
+            chunk_size=self.chunk_size
+        )
+
+    def records(self):
+        # Хеш пароля и флаги выгружаются, чтобы перенесенные
+        # пользователи могли войти как раньше
+        for row in self.rows(
+            User.objects.all(), 'username', 'first_name', 'last_name',
+            'email', 'password', 'is_active', 'is_staff', 'date_joined'
+        ):
+            row['date_joined'] = row['date_joined'].isoformat()
+            yield {'type': 'user', **row}
+        for row in self.rows(
+            Group.objects.all(), 'title', 'slug', 'description'
+        ):
+            yield {'type': 'group', **row}
+        posts = self.rows(
+            Post.objects.all(), 'id', 'author__username', 'group__slug',
+            'text', 'pub_date', 'image'
+        )
+        for chunk in chunked(posts, self.chunk_size):
+            self.copy_images(row['image'] for row in chunk if row['image'])
+            for row in chunk:
+                yield {
+                    'type': 'post',
+                    'id': row['id'],
+                    'author': row['author__username'],
+                    'group': row['group__slug'],
+                    'text': row['text'],
+                    'pub_date': row['pub_date'].isoformat(),
+                    'image': row['image'],
+                }
+        for row in self.rows(
+            Comment.objects.all(), 'post_id', 'author__username', 'text',
+            'pub_date'
+        ):
+            yield {
+                'type': 'comment',
+                'post': row['post_id'],
+                'author': row['author__username'],
+                'text': row['text'],
+                'pub_date': row['pub_date'].isoformat(),
+            }
+        for row in self.rows(
+            Follow.objects.all(), 'user__username', 'author__username'
+        ):
+            yield {
+                'type': 'follow',
+                'user': row['user__username'],
+                'author': row['author__username'],
+            }
+
+    def copy_images(self, names):
+        if self.media:
+            self.missing += sum(
+                not copied for copied in self.pool.map(self.copy_image, names)
+            )
+
+    def copy_image(self, name):
+        target = os.path.join(self.media, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            with default_storage.open(name, 'rb') as source, \
+                    open(target, 'wb') as destination:
+                shutil.copyfileobj(source, destination)
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,241 @@
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from posts.bulk import manual_pub_date, rebuild_derived
+from posts.models import Comment, Follow, Group, Post, User
+
+PASSWORD = 'yatube-benchmark'
+WORDS = (
+    'лента пост автор группа подписка комментарий картинка новости '
+    'погода спорт музыка кино книги путешествия код тест релиз кеш '
+    'индекс запрос страница профиль друзья выходные город море'
+).split()
+IMAGE_COLORS = ('red', 'green', 'blue', 'orange', 'purple', 'gray')
+
+
+def skewed_weights(size, exponent=1.1):
+    """Веса по закону Ципфа: немногие объекты получают большую часть."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def chunks(total, size):
+    for start in range(0, total, size):
+        yield min(size, total - start)
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические данные для нагрузочного тестирования: '
+        'пользователей, группы, посты, комментарии и подписки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=2000000)
+        parser.add_argument(
+            '--follows-per-user', type=int, default=30,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Число разных картинок, которые получат посты'
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.1,
+            help='Доля постов с картинкой'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересобирать ленты, счетчики и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.started = timezone.now()
+
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        images = self.create_images(options['images'])
+        post_ids = self.create_posts(
+            options['posts'], user_ids, group_ids, images,
+            options['image_ratio'], options['days']
+        )
+        self.create_comments(
+            options['comments'], user_ids, post_ids, options['days']
+        )
+        self.create_follows(user_ids, options['follows_per_user'])
+
+        if not options['skip_derived']:
+            self.log('Пересборка лент, счетчиков и поискового индекса')
+            rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {(timezone.now() - self.started).seconds} с. '
+            f'Пароль пользователей: {PASSWORD}'
+        ))
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def bulk_create(self, model, objects):
+        # Размер INSERT выбирает бэкенд: в Django 2.2 явный batch_size
+        # не ограничивается лимитами SQLite на число строк VALUES
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+
+    def create_users(self, total):
+        self.log(f'Пользователи: {total}')
+        password = make_password(PASSWORD)
+        first_id = self.next_id(User)
+        prefix = f'bench{first_id}_'
+        start = 0
+        for size in chunks(total, self.chunk_size):
+            self.bulk_create(User, [
+                User(
+                    username=f'{prefix}{start + i}',
+                    first_name=f'Автор{start + i}',
+                    password=password,
+                )
+                for i in range(size)
+            ])
+            start += size
+        return list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_groups(self, total):
+        self.log(f'Группы: {total}')
+        first_id = self.next_id(Group)
+        self.bulk_create(Group, [
+            Group(
+                title=f'Группа {first_id + i}',
+                slug=f'bench-{first_id + i}',
+                description=' '.join(self.rnd.choices(WORDS, k=20)),
+            )
+            for i in range(total)
+        ])
+        return list(
+            Group.objects.filter(pk__gte=first_id)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_images(self, total):
+        self.log(f'Картинки: {total}')
+        names = []
+        for i in range(total):
+            buffer = io.BytesIO()
+            color = IMAGE_COLORS[i % len(IMAGE_COLORS)]
+            Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/bench_{i}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def post_date(self, index, total, days):
+        """Дата index-го из total постов: даты растут вместе с id."""
+        span = timedelta(days=days).total_seconds()
+        return self.started - timedelta(seconds=span * (1 - index / total))
+
+    def create_posts(self, total, user_ids, group_ids, images, image_ratio,
+                     days):
+        self.log(f'Посты: {total}')
+        first_id = self.next_id(Post)
+        weights = skewed_weights(len(user_ids))
+        created = 0
+        with manual_pub_date(Post):
+            for size in chunks(total, self.chunk_size):
+                posts = []
+                for i in range(size):
+                    posts.append(Post(
+                        author_id=self.rnd.choices(
+                            user_ids, cum_weights=weights
+                        )[0],
+                        group_id=(
+                            self.rnd.choice(group_ids)
+                            if group_ids and self.rnd.random() < 0.5
+                            else None
+                        ),
+                        text=' '.join(
+                            self.rnd.choices(WORDS, k=self.rnd.randint(5, 60))
+                        ),
+                        image=(
+                            self.rnd.choice(images)
+                            if images and self.rnd.random() < image_ratio
+                            else ''
+                        ),
+                        pub_date=self.post_date(created + i, total, days),
+                    ))
+                self.bulk_create(Post, posts)
+                created += size
+                self.log(f'  {created}/{total}')
+        return range(first_id, self.next_id(Post))
+
+    def create_comments(self, total, user_ids, post_ids, days):
+        self.log(f'Комментарии: {total}')
+        if not post_ids:
+            return
+        created = 0
+        with manual_pub_date(Comment):
+            for size in chunks(total, self.chunk_size):
+                comments = []
+                for _ in range(size):
+                    index = self.rnd.randrange(len(post_ids))
+                    # Комментарий пишут между публикацией поста и сейчас
+                    post_date = self.post_date(index, len(post_ids), days)
+                    delay = (self.started - post_date) * self.rnd.random()
+                    comments.append(Comment(
+                        post_id=post_ids[index],
+                        author_id=self.rnd.choice(user_ids),
+                        text=' '.join(
+                            self.rnd.choices(WORDS, k=self.rnd.randint(3, 20))
+                        ),
+                        pub_date=post_date + delay,
+                    ))
+                self.bulk_create(Comment, comments)
+                created += size
+                self.log(f'  {created}/{total}')
+
+    def create_follows(self, user_ids, follows_per_user):
+        """Подписки с перекосом: на популярных авторов подписаны многие."""
+        self.log('Подписки')
+        weights = skewed_weights(len(user_ids))
+        follows = []
+        for user_id in user_ids:
+            count = min(
+                int(self.rnd.expovariate(1 / follows_per_user)),
+                len(user_ids) - 1
+            ) if follows_per_user else 0
+            authors = set(
+                self.rnd.choices(user_ids, cum_weights=weights, k=count)
+            )
+            authors.discard(user_id)
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+            if len(follows) >= self.chunk_size:
+                self.bulk_create(Follow, follows)
+                follows = []
+        self.bulk_create(Follow, follows)
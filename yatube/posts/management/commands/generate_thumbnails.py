@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры изображений постов'
+
+    def handle(self, *args, **options):
+        post_ids = (
+            Post.objects.exclude(image='')
+            .filter(thumbnail='')
+            .values_list('pk', flat=True)
+        )
+        total = 0
+        for post_id in post_ids.iterator():
+            if thumbnails.generate(post_id):
+                total += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Построено миниатюр: {total}')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(
+                'Полнотекстовый индекс доступен только на SQLite'
+            )
+            return
+        with transaction.atomic():
+            total = search.reindex()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {total}')
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг популярных постов по комментариям '
+        'за последние дни, запускается по расписанию'
+    )
+
+    def handle(self, *args, **options):
+        total = trending.rerank()
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинг пересчитан, постов: {total}')
+        )
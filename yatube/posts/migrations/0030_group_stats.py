@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+TOP_AUTHORS = 3
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupAuthorStats = apps.get_model('posts', 'GroupAuthorStats')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    per_author = list(
+        Post.objects.filter(group__isnull=False)
+        .values_list('group_id', 'author_id')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    GroupAuthorStats.objects.bulk_create(
+        (
+            GroupAuthorStats(
+                group_id=group_id, author_id=author_id, posts_count=total
+            )
+            for group_id, author_id, total in per_author
+        )
+    )
+    authors = {}
+    for group_id, author_id, total in per_author:
+        authors.setdefault(group_id, []).append((-total, author_id))
+    totals = {
+        group_id: (total, last)
+        for group_id, total, last in Post.objects.filter(
+            group__isnull=False
+        ).values_list('group_id').annotate(
+            total=Count('pk'), last=Max('pub_date')
+        ).order_by()
+    }
+    GroupStats.objects.bulk_create(
+        (
+            GroupStats(
+                group_id=group_id,
+                posts_count=totals.get(group_id, (0, None))[0],
+                last_post_date=totals.get(group_id, (0, None))[1],
+                top_authors=','.join(
+                    str(author_id) for _, author_id
+                    in sorted(authors.get(group_id, ()))[:TOP_AUTHORS]
+                ),
+            )
+            for group_id in Group.objects.values_list('pk', flat=True)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0029_trendingpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста')),
+                ('top_authors', models.CharField(blank=True, max_length=200, verbose_name='Самые активные авторы')),
+            ],
+            options={
+                'verbose_name': 'Сводка группы',
+                'verbose_name_plural': 'Сводки групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupAuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Посты автора в группе',
+                'verbose_name_plural': 'Посты авторов в группах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupauthorstats',
+            index=models.Index(fields=['group', '-posts_count'], name='group_author_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthorstats',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='uniq_group_author'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
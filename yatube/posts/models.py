@@ -35,15 +35,55 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True,
     )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False,
+        help_text='Растет при каждом изменении поста'
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        # Индексы повторяют порядок курсорной пагинации (pub_date, id),
+        # поэтому ленты читаются по индексу без сортировки
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_date_idx'
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:STR_LENGTH]
 
+    @property
+    def thumbnail_url(self):
+        """URL миниатюры, пока она не построена - URL оригинала."""
+        if not self.image:
+            return ''
+        return self.thumbnail or self.image.url
+
 
 class Group(models.Model):
     """Модель группы постов сообщества."""
@@ -90,6 +130,14 @@ class Comment(CreatedModel):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('post', '-pub_date', '-id'),
+                name='comment_post_date_idx'
+            ),
+            # Комментарии за последние дни для пересчета популярного
+            models.Index(fields=('pub_date',), name='comment_date_idx'),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = "Комментарии"
 
@@ -114,8 +162,240 @@ class Follow(models.Model):
     )
 
     class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='uniq_follow'
+            ),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = "Подписки"
 
     def __str__(self):
         return self.author
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write), поэтому
+    лента подписок читается одним диапазонным запросом по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(
+        'Дата создания поста'
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='timeline_user_date_id_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='uniq_timeline_post'
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        return f'{self.user} - {self.post}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя.
+
+    Обновляются сигналами при создании и удалении постов и подписок,
+    расхождения исправляет команда reconcile_counters.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class Suggestion(models.Model):
+    """Рекомендованный пользователю автор.
+
+    Таблицу целиком пересчитывает команда compute_suggestions,
+    рекомендации пользователя читаются одним запросом по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    score = models.FloatField('Очки')
+    created = models.DateTimeField('Дата расчета')
+
+    class Meta:
+        ordering = ('-score',)
+        indexes = (
+            models.Index(
+                fields=('user', '-score'),
+                name='suggestion_user_score_idx'
+            ),
+        )
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+    def __str__(self):
+        return f'{self.user} - {self.author}'
+
+
+class TrendingPost(models.Model):
+    """Пост в рейтинге популярного.
+
+    Очки растут с каждым комментарием и затухают со временем,
+    см. posts.trending. Таблица ограничена LEADERBOARD_SIZE строк.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    score = models.FloatField('Очки')
+
+    class Meta:
+        ordering = ('-score',)
+        indexes = (
+            models.Index(fields=('-score',), name='trending_score_idx'),
+        )
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+    def __str__(self):
+        return str(self.post)
+
+
+class GroupStats(models.Model):
+    """Сводка группы для каталога групп.
+
+    Обновляется сигналами при создании, удалении и переносе постов
+    между группами, см. posts.group_stats.
+    """
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0
+    )
+    last_post_date = models.DateTimeField(
+        'Дата последнего поста',
+        null=True,
+        blank=True
+    )
+    # id самых активных авторов группы через запятую
+    top_authors = models.CharField(
+        'Самые активные авторы',
+        max_length=200,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Сводка группы'
+        verbose_name_plural = 'Сводки групп'
+
+    def __str__(self):
+        return str(self.group)
+
+    @property
+    def top_author_ids(self):
+        return [int(pk) for pk in self.top_authors.split(',') if pk]
+
+
+class GroupAuthorStats(models.Model):
+    """Число постов автора в группе, из него выбираются лучшие авторы."""
+
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Группа'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('group', '-posts_count'),
+                name='group_author_count_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('group', 'author'),
+                name='uniq_group_author'
+            ),
+        )
+        verbose_name = 'Посты автора в группе'
+        verbose_name_plural = 'Посты авторов в группах'
+
+    def __str__(self):
+        return f'{self.group} - {self.author}'
@@ -0,0 +1,140 @@
+"""Полнотекстовый поиск по текстам постов.
+
+На SQLite используется таблица FTS5, которую обновляют сигналы
+сохранения и удаления постов. Идентификатор записи в ней совпадает
+с id поста. На других СУБД поиск откатывается к icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from posts.models import Post
+
+FTS_TABLE = 'posts_post_fts'
+BATCH_SIZE = 1000
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берется в кавычки, поэтому спецсимволы синтаксиса
+    FTS5 в запросе ничего не ломают; слова объединяются через И.
+    """
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def index_post(post_id, text):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post_id, text]
+        )
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def reindex():
+    """Перестраивает индекс по всем постам, возвращает их число."""
+    if not is_supported():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        rows = Post.objects.order_by('pk').values_list('pk', 'text')
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                    batch
+                )
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                batch
+            )
+            total += len(batch)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return total
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset только посты, подходящие под запрос."""
+    if not is_supported():
+        return queryset.filter(text__icontains=query)
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match,)
+    ))
+
+
+class SearchResults:
+    """Результаты поиска, упорядоченные по релевантности (bm25).
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator:
+    страница стоит одного запроса к индексу и одного - за постами.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = match_expression(query) if is_supported() else None
+
+    def count(self):
+        if self.match is None:
+            return self._fallback().count()
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if self.match is None:
+            return list(self._fallback()[key])
+        if not self.match:
+            return []
+        start = key.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, key.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def _fallback(self):
+        return Post.objects.select_related('author', 'group').filter(
+            text__icontains=self.query
+        )
@@ -0,0 +1,178 @@
+from core.cache import bump_generation
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from posts import (
+    counters,
+    follows,
+    generations,
+    group_stats,
+    search,
+    thumbnails,
+    timeline,
+    trending
+)
+from posts.models import Comment, Follow, Group, GroupStats, Post, User
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, **kwargs):
+    """Запоминает прежние группу и картинку поста и растит версию.
+
+    Прежняя группа нужна, чтобы сбросить и ее ленту, а при замене
+    картинки устаревшая миниатюра стирается. По версии поста
+    сбрасывается закешированная карточка.
+    """
+    previous = None
+    if instance.pk:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image', 'version'
+        ).first()
+    instance._old_group_id, old_image, version = previous or (None, '', -1)
+    instance.version = version + 1
+    instance._image_changed = instance.image.name != old_image
+    if instance._image_changed:
+        instance.thumbnail = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Рассылает новый пост в ленты подписчиков и сбрасывает кеш лент."""
+    if created:
+        counters.bump(instance.author_id, 'posts_count', 1)
+        timeline.fan_out.delay(instance.pk)
+    if instance._image_changed and instance.image:
+        thumbnails.schedule(instance.pk)
+    search.index_post(instance.pk, instance.text)
+    group_stats.post_saved(instance, instance._old_group_id)
+    generations.invalidate_post(instance, (instance._old_group_id,))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, 'posts_count', -1)
+    search.unindex_post(instance.pk)
+    if instance.group_id:
+        group_stats.post_removed(instance.group_id, instance.author_id)
+    generations.invalidate_post(instance)
+
+
+def _group_authors(group):
+    return set(
+        Post.objects.filter(group=group)
+        .values_list('author__username', flat=True).distinct()
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_group(sender, instance, **kwargs):
+    """Запоминает прежние slug и название группы."""
+    instance._previous_group = None
+    if instance.pk:
+        instance._previous_group = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', 'title').first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+    previous = getattr(instance, '_previous_group', None)
+    if previous and previous != (instance.slug, instance.title):
+        # Ссылки и название группы есть в лентах ее авторов
+        generations.invalidate_group(
+            (previous[0], instance.slug), _group_authors(instance)
+        )
+    else:
+        bump_generation(generations.group(instance.slug), generations.GROUPS)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления у постов группы уже не будет, авторов
+    # нужно найти заранее
+    instance._authors = _group_authors(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    generations.invalidate_group(
+        (instance.slug,), getattr(instance, '_authors', ())
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, **kwargs):
+    """Запоминает прежние имя и username пользователя."""
+    instance._previous_names = None
+    update_fields = kwargs.get('update_fields')
+    # Вход пользователя сохраняет только last_login
+    if update_fields and set(update_fields).isdisjoint(NAME_FIELDS):
+        return
+    if instance.pk:
+        instance._previous_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """При смене имени сбрасывает ленты, где показаны посты автора."""
+    previous = getattr(instance, '_previous_names', None)
+    names = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if previous and previous != names:
+        generations.invalidate_author(
+            instance.pk, previous[0], instance.username
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """Считает комментарий и поднимает пост в популярном."""
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        trending.bump(instance.post_id, instance.pub_date)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+def _follow_changed(follow):
+    # Профиль автора показывает число подписчиков,
+    # профиль подписчика - число его подписок
+    bump_generation(
+        generations.profile(follow.author.username),
+        generations.profile(follow.user.username)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Дополняет ленту подписчика постами нового автора."""
+    if created:
+        counters.bump(instance.author_id, 'followers_count', 1)
+        counters.bump(instance.user_id, 'following_count', 1)
+        follows.forget(instance.user_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+        _follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Убирает посты автора из ленты бывшего подписчика."""
+    counters.bump(instance.author_id, 'followers_count', -1)
+    counters.bump(instance.user_id, 'following_count', -1)
+    follows.forget(instance.user_id)
+    timeline.drop(instance.user_id, instance.author_id)
+    _follow_changed(instance)
@@ -0,0 +1,193 @@
+"""Рекомендации "на кого подписаться", рассчитанные заранее.
+
+Команда compute_suggestions загружает весь граф подписок в массивы
+формата CSR и считает очки кандидатов для каждого пользователя:
+
+* друзья друзей - авторы, на которых подписаны авторы из подписок
+  пользователя (строки матрицы A * A);
+* совместные подписки - авторы, на которых чаще всего подписаны
+  вместе с авторами из подписок пользователя.
+
+Лучшие кандидаты записываются в таблицу Suggestion, страницы читают
+их одним запросом.
+"""
+import itertools
+from array import array
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from posts import follows
+from posts.bulk import chunked
+from posts.models import Follow, Suggestion
+
+COFOLLOW_WEIGHT = 2.0
+SUGGESTIONS_PER_USER = 20
+SUGGESTIONS_SHOWN = 5
+# Подписчиков автора, по которым ищутся его соседи, и число соседей
+COFOLLOW_SAMPLE = 50
+COFOLLOW_NEIGHBOURS = 20
+BATCH_SIZE = 500
+
+
+class Graph:
+    """Разреженная матрица смежности в формате CSR.
+
+    Строки и столбцы - pk пользователей, соседи вершины v лежат
+    в indices[indptr[v]:indptr[v + 1]], веса ребер, если они есть, -
+    в weights по тем же позициям.
+    """
+
+    def __init__(self, indptr, indices, weights=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    @classmethod
+    def from_edges(cls, edges, size):
+        """Матрица из пар (строка, столбец), упорядоченных по строке."""
+        counts = array('q', bytes(8 * (size + 1)))
+        indices = array('i')
+        for row, column in edges:
+            counts[row + 1] += 1
+            indices.append(column)
+        return cls(array('q', itertools.accumulate(counts)), indices)
+
+    @property
+    def size(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self):
+        parts = (self.indptr, self.indices, self.weights or array('d'))
+        return sum(len(part) * part.itemsize for part in parts)
+
+    def row(self, vertex):
+        return self.indices[self.indptr[vertex]:self.indptr[vertex + 1]]
+
+    def weighted_row(self, vertex):
+        start, stop = self.indptr[vertex], self.indptr[vertex + 1]
+        return zip(self.indices[start:stop], self.weights[start:stop])
+
+    def transpose(self):
+        """Та же матрица по столбцам: подписчики каждого автора."""
+        counts = array('q', bytes(8 * (self.size + 1)))
+        for column in self.indices:
+            counts[column + 1] += 1
+        indptr = array('q', itertools.accumulate(counts))
+        free = array('q', indptr)
+        indices = array('i', bytes(4 * len(self.indices)))
+        for row in range(self.size):
+            for column in self.row(row):
+                indices[free[column]] = row
+                free[column] += 1
+        return Graph(indptr, indices)
+
+
+def load_graph(chunk_size=10000):
+    """Граф подписок из базы: строка - подписчик, столбец - автор."""
+    last = Follow.objects.order_by('-user_id').values_list(
+        'user_id', flat=True
+    ).first()
+    last_author = Follow.objects.order_by('-author_id').values_list(
+        'author_id', flat=True
+    ).first()
+    edges = Follow.objects.order_by('user_id', 'author_id').values_list(
+        'user_id', 'author_id'
+    ).iterator(chunk_size=chunk_size)
+    return Graph.from_edges(edges, max(last or 0, last_author or 0) + 1)
+
+
+def cofollow_neighbours(graph, followers):
+    """Для каждого автора - доли его подписчиков, подписанных на других.
+
+    Доли считаются по равномерной выборке из COFOLLOW_SAMPLE
+    подписчиков, так что популярные авторы стоят столько же, сколько
+    остальные. Сохраняются COFOLLOW_NEIGHBOURS лучших соседей, с весом
+    COFOLLOW_WEIGHT, в виде взвешенной матрицы.
+    """
+    counts = array('q', bytes(8 * (followers.size + 1)))
+    indices = array('i')
+    weights = array('d')
+    for author in range(followers.size):
+        fans = followers.row(author)
+        if fans:
+            sample = fans[::max(1, len(fans) // COFOLLOW_SAMPLE)]
+            sample = sample[:COFOLLOW_SAMPLE]
+            together = Counter()
+            for fan in sample:
+                together.update(graph.row(fan))
+            del together[author]
+            for other, count in together.most_common(COFOLLOW_NEIGHBOURS):
+                indices.append(other)
+                weights.append(count / len(sample) * COFOLLOW_WEIGHT)
+                counts[author + 1] += 1
+    return Graph(array('q', itertools.accumulate(counts)), indices, weights)
+
+
+def score(graph, limit=SUGGESTIONS_PER_USER):
+    """Лучшие кандидаты каждого пользователя: (user_id, [(id, очки)]).
+
+    Каждый путь через друга дает очко, совместная подписка - долю
+    подписчиков с весом COFOLLOW_WEIGHT.
+    """
+    neighbours = cofollow_neighbours(graph, graph.transpose())
+    for user in range(graph.size):
+        following = graph.row(user)
+        if not following:
+            continue
+        scores = Counter()
+        for author in following:
+            scores.update(graph.row(author))
+        for author in following:
+            for candidate, share in neighbours.weighted_row(author):
+                scores[candidate] = scores.get(candidate, 0) + share
+        for seen in itertools.chain((user,), following):
+            scores.pop(seen, None)
+        if scores:
+            yield user, scores.most_common(limit)
+
+
+def store(results):
+    """Заменяет рекомендации пользователей результатами score.
+
+    Рекомендации пользователя заменяются в одной транзакции, после
+    прохода удаляются строки пользователей, для которых кандидатов
+    больше нет. Возвращает число записанных строк.
+    """
+    created = timezone.now()
+    total = 0
+    for chunk in chunked(results, BATCH_SIZE):
+        with transaction.atomic():
+            Suggestion.objects.filter(
+                user_id__in=[user for user, _ in chunk]
+            ).delete()
+            rows = Suggestion.objects.bulk_create(
+                Suggestion(
+                    user_id=user, author_id=author, score=value,
+                    created=created
+                )
+                for user, candidates in chunk
+                for author, value in candidates
+            )
+        total += len(rows)
+    Suggestion.objects.filter(created__lt=created).delete()
+    return total
+
+
+def for_user(user, exclude=(), limit=SUGGESTIONS_SHOWN):
+    """Авторы, рекомендованные user, одним запросом.
+
+    Авторы, на которых пользователь подписался после расчета,
+    отбрасываются по кешированному графу подписок.
+    """
+    if not user.is_authenticated:
+        return []
+    skip = follows.following_ids(user).union(exclude)
+    authors = (
+        suggestion.author
+        for suggestion in user.suggestions.select_related('author')
+        if suggestion.author_id not in skip
+    )
+    return list(itertools.islice(authors, limit))
@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import (
+    Comment, Follow, Group, Post, Suggestion, TimelineEntry, User
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTest(TestCase):
+    """Генератор данных и нагрузочный прогон."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        call_command(
+            'generate_data',
+            users=20, groups=3, posts=120, comments=50,
+            follows_per_user=5, images=2, chunk_size=25,
+            stdout=StringIO()
+        )
+
+    def test_generate_data(self):
+        """Команда создает данные и пересобирает производные таблицы."""
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.order_by('-pub_date').first()
+        self.assertEqual(post, Post.objects.order_by('-pk').first())
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertFalse(
+            Comment.objects.filter(pub_date__lt=F('post__pub_date')).exists()
+        )
+
+    def test_benchmark_views(self):
+        """Прогон сохраняет перцентили задержек и число запросов."""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'run.json')
+        call_command(
+            'benchmark_views', requests=3, output=output, stdout=StringIO()
+        )
+        with open(output) as run:
+            results = json.load(run)['results']
+        self.assertEqual(
+            set(results),
+            {
+                'index', 'group_posts', 'profile', 'post_detail',
+                'follow_index', 'index_feed'
+            }
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertGreater(result['queries'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataDefaultsTest(TestCase):
+    """Генератор с размером пачки по умолчанию."""
+
+    def test_default_chunk_size(self):
+        """Пачки больше 500 строк не упираются в лимит SQLite."""
+        call_command(
+            'generate_data',
+            users=600, groups=2, posts=600, comments=600,
+            follows_per_user=1, images=0, skip_derived=True,
+            stdout=StringIO()
+        )
+        self.assertEqual(User.objects.count(), 600)
+        self.assertEqual(Post.objects.count(), 600)
+        self.assertEqual(Comment.objects.count(), 600)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportImportTest(TestCase):
+    """Потоковая выгрузка и загрузка постов."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Загрузка выгрузки восстанавливает данные и картинки."""
+        call_command(
+            'generate_data',
+            users=10, groups=2, posts=30, comments=20,
+            follows_per_user=3, images=1, image_ratio=1, chunk_size=7,
+            stdout=StringIO()
+        )
+        staff = User.objects.first()
+        staff.set_password('migrated-password')
+        staff.is_staff = True
+        staff.save()
+        path = os.path.join(self.export_dir, 'dump.jsonl.gz')
+        media = os.path.join(self.export_dir, 'media')
+        call_command(
+            'export_posts', path, media=media, chunk_size=7, stderr=StringIO()
+        )
+        expected = list(
+            Post.objects.order_by('pk').values_list(
+                'pk', 'author__username', 'group__slug', 'text', 'pub_date',
+                'image'
+            )
+        )
+        follows = Follow.objects.count()
+        image = expected[0][-1]
+        accounts = list(
+            User.objects.order_by('username').values_list(
+                'username', 'password', 'is_active', 'is_staff',
+                'date_joined'
+            )
+        )
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, image))
+
+        call_command(
+            'import_posts', path, media=media, chunk_size=7, stdout=StringIO()
+        )
+        self.assertEqual(
+            list(
+                Post.objects.order_by('pk').values_list(
+                    'pk', 'author__username', 'group__slug', 'text',
+                    'pub_date', 'image'
+                )
+            ),
+            expected
+        )
+        self.assertEqual(
+            list(
+                User.objects.order_by('username').values_list(
+                    'username', 'password', 'is_active', 'is_staff',
+                    'date_joined'
+                )
+            ),
+            accounts
+        )
+        self.assertTrue(
+            self.client.login(
+                username=staff.username, password='migrated-password'
+            )
+        )
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertEqual(Follow.objects.count(), follows)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, image)))
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_clashing_ids(self):
+        """Посты с уже занятыми id не загружаются поверх существующих."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        path = os.path.join(self.export_dir, 'clash.jsonl')
+        call_command('export_posts', path, stderr=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.get().text, post.text)
+
+
+class SuggestionsTest(TestCase):
+    """Расчет рекомендаций "на кого подписаться"."""
+
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'fan', 'far', 'cofollowed')
+        }
+        for user, author in (
+            ('reader', 'friend'),
+            ('friend', 'far'),
+            ('fan', 'friend'),
+            ('fan', 'cofollowed'),
+        ):
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author]
+            )
+
+    def suggested(self, name):
+        return set(
+            Suggestion.objects.filter(user=self.users[name])
+            .values_list('author__username', flat=True)
+        )
+
+    def test_compute_suggestions(self):
+        call_command('compute_suggestions', stdout=StringIO())
+        # Друг друга и автор, на которого подписан другой подписчик
+        self.assertEqual(self.suggested('reader'), {'far', 'cofollowed'})
+        self.assertEqual(self.suggested('friend'), set())
+
+        Follow.objects.filter(user=self.users['reader']).delete()
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggested('reader'), set())
+
+    def test_views_skip_followed(self):
+        call_command('compute_suggestions', stdout=StringIO())
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['far']
+        )
+        self.client.force_login(self.users['reader'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['suggestions'], [self.users['cofollowed']]
+        )
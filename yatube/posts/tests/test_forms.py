@@ -1,13 +1,23 @@
+import io
+import os
 import shutil
 import tempfile
+from unittest import mock
 
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from PIL import Image
+
+from core import tasks
+from posts import images
 from posts.forms import PostForm
 from posts.models import Comment, Group, Post
 
@@ -90,13 +100,8 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(last_post.author.username, form_data['author'])
         self.assertEqual(last_post.group.id, form_data['group'])
         self.assertEqual(last_post.text, form_data['text'])
-        # self.assertEqual(last_post.image, form_data['image'])
-        # так проверить не удалось
-        self.assertTrue(
-            Post.objects.filter(
-                image='posts/small.gif'
-            ).first()
-        )
+        # Картинка перекодирована в WebP и названа по содержимому
+        self.assertRegex(last_post.image.name, r'^posts/\w\w/\w{64}\.webp$')
 
     def test_edit_post(self):
         """Валидная форма редактирует запись в Post."""
@@ -126,6 +131,34 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(last_post.group.id, form_data['group'])
         self.assertEqual(last_post.text, form_data['text'])
 
+    def test_thumbnail_generated(self):
+        """Миниатюра строится заранее и выводится по сохраненному URL."""
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='thumb.gif', content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+        self.assertEqual(post.thumbnail, '')
+        self.assertEqual(post.thumbnail_url, post.image.url)
+        # Миниатюру строит фоновая задача
+        tasks.run_pending()
+        post.refresh_from_db()
+        url = post.thumbnail
+        self.assertTrue(url)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, url)
+
+        post.image = SimpleUploadedFile(
+            name='other.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail, '')
+
     def test_title_label(self):
         """Проверяет метки полей формы"""
         text_label = self.form.fields['text'].label
@@ -172,3 +205,142 @@ class CommentTest(TestCase):
         )
         comment = response.context['comments'][0]
         self.assertEqual(comment.text, self.comment.text)
+
+    def test_comments_scoped_to_post(self):
+        """Под постом выводятся только его комментарии."""
+        other_post = Post.objects.create(author=self.user, text='Другой')
+        Comment.objects.create(
+            post=other_post,
+            author=self.user,
+            text='Чужой комментарий'
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertEqual(list(response.context['comments']), [self.comment])
+
+    def test_comments_constant_queries(self):
+        """Число запросов не зависит от количества комментариев."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        # Прогрев: сессия и пользователь попадают в кеш
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.authorized_client.get(url)
+        for i in range(30):
+            author = User.objects.create_user(username=f'commentator{i}')
+            Comment.objects.create(
+                post=self.post,
+                author=author,
+                text=f'Комментарий {i}'
+            )
+        with CaptureQueriesContext(connection) as many:
+            response = self.authorized_client.get(url)
+        self.assertEqual(len(few), len(many))
+        self.assertTrue(response.context['comments'].has_next())
+
+
+def jpeg(width, height, orientation=None):
+    """JPEG заданного размера, с EXIF-поворотом, если он указан."""
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(
+        buffer, 'JPEG', exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageIngestTest(TestCase):
+    """Прием картинок: перекодирование, ограничения и дедупликация."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def publish(self, content, name='photo.jpg'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фотографией',
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    def test_reencoded_without_metadata(self):
+        """Картинка уменьшается, поворачивается и теряет EXIF."""
+        self.publish(jpeg(3000, 1500, orientation=6))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, images.FORMAT)
+            self.assertEqual(image.size, (1024, 2048))
+            self.assertNotIn('exif', image.info)
+
+    def test_same_image_stored_once(self):
+        """Одинаковые загрузки ссылаются на один файл."""
+        content = jpeg(64, 64)
+        self.publish(content, 'first.jpg')
+        self.publish(content, 'second.jpg')
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        directory = os.path.dirname(Post.objects.first().image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_limits(self):
+        """Слишком большой файл и слишком много пикселей отклоняются."""
+        limits = (
+            ('MAX_UPLOAD_BYTES', 100, 'Файл больше'),
+            ('MAX_PIXELS', 100, 'Картинка больше 100 пикселей'),
+            ('MAX_PIXELS', 2500, 'Картинка больше 2500 пикселей'),
+        )
+        for limit, value, message in limits:
+            with self.subTest(limit=limit), \
+                    mock.patch.object(images, limit, value):
+                response = self.publish(jpeg(64, 64))
+                self.assertContains(response, message)
+        self.assertFalse(Post.objects.exists())
+
+    def test_rejected_form_stores_nothing(self):
+        """Картинка отклоненной формы не попадает в хранилище."""
+        content = jpeg(48, 32)
+        name = images.content_name(SimpleUploadedFile('photo.jpg', content))
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': '',
+            'image': SimpleUploadedFile('photo.jpg', content, 'image/jpeg'),
+        })
+        self.assertTrue(response.context['form'].errors)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_admin_upload_reencoded(self):
+        """Картинка, загруженная через админку, тоже перекодируется."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:posts_post_add'), {
+            'text': 'Пост из админки',
+            'author': self.user.pk,
+            'group': '',
+            'image': SimpleUploadedFile(
+                'photo.jpg', jpeg(40, 30), 'image/jpeg'
+            ),
+        })
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith(f'.{images.EXTENSION}'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, images.FORMAT)
+
+    def test_pixels_display(self):
+        for count, text in (
+            (100, '100 пикселей'),
+            (1500000, '1.5 мегапикселей'),
+            (40 * 10 ** 6, '40 мегапикселей'),
+        ):
+            with self.subTest(count=count):
+                self.assertEqual(images.pixels_display(count), text)
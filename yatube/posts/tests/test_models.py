@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.counters import get_stats
+from posts.models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -103,3 +107,54 @@ class GroupModelTest(TestCase):
                     expected,
                     f'Проверьте значение verbose_name поля {value}'
                 )
+
+
+class CountersTest(TestCase):
+    """Денормализованные счетчики."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Текст')
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        stats = get_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(get_stats(self.reader).following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        for text in ('Первый', 'Второй'):
+            Comment.objects.create(
+                post=self.post, author=self.reader, text=text
+            )
+        Post.objects.update(comments_count=5)
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(get_stats(self.author).posts_count, 1)
+
+    def test_author_deletion(self):
+        """Удаление автора не ломается на обновлении счетчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=self.author.pk))
+        self.assertEqual(get_stats(self.reader).following_count, 0)
@@ -1,10 +1,28 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+from xml.etree import ElementTree
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Group, Follow, Post
+from core import tasks
+from posts import (
+    cards, follows, generations, group_stats, search, timeline, trending
+)
+from posts.models import (
+    Comment, Group, GroupAuthorStats, GroupStats, Follow, Post,
+    TimelineEntry, TrendingPost
+)
 from posts.forms import PostForm
 
 User = get_user_model()
@@ -201,23 +219,229 @@ class PostViewsTest(TestCase):
 
     def test_index_cache(self):
         """Проверка работы кэша на главной странице."""
-        # Получаем текущее количество постов
+        cache.clear()
         posts = self.authorized_client.get(reverse('posts:index')).content
-        # Создаем новый пост
+        # Изменение в обход сигналов не сбрасывает кэш
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        posts_with_cache = self.authorized_client.get(
+            reverse('posts:index')).content
+        self.assertEqual(posts, posts_with_cache)
+        # Новый пост сразу сбрасывает кэш ленты
         Post.objects.create(
             text='Тестовый текст нового поста',
             author=self.user,
         )
-        # Запрашиваем страницу с постами и проверяем, что там нет нового поста
-        posts_with_cache = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertEqual(posts, posts_with_cache)
-        # Очищаем кеш
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotEqual(posts, response.content)
+        self.assertContains(response, 'Тестовый текст нового поста')
+
+    def test_group_cache_invalidated_on_move(self):
+        """Перенос поста в другую группу сбрасывает кэш обеих групп."""
         cache.clear()
-        # Запрашиваем страницу с постами и проверяем, что там появился пост
-        posts_without_cache = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertNotEqual(posts, posts_without_cache)
+        old_url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        new_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group_2.slug}
+        )
+        self.authorized_client.get(old_url)
+        self.authorized_client.get(new_url)
+        post = Post.objects.create(
+            text='Переезжающий пост', author=self.user, group=self.group
+        )
+        self.assertContains(self.authorized_client.get(old_url), post.text)
+        post.group = self.group_2
+        post.save()
+        self.assertNotContains(self.authorized_client.get(old_url), post.text)
+        self.assertContains(self.authorized_client.get(new_url), post.text)
+
+    def test_group_rename_and_delete_reset_cache(self):
+        """Смена slug и удаление группы сбрасывают ее страницы."""
+        cache.clear()
+        group = Group.objects.create(title='Кириллица', slug='old-slug')
+        Post.objects.create(text='Пост группы', author=self.user, group=group)
+        old_url = reverse('posts:group_list', kwargs={'slug': 'old-slug'})
+        self.assertEqual(self.client.get(old_url).status_code, HTTPStatus.OK)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertEqual(
+            self.client.get(old_url).status_code, HTTPStatus.NOT_FOUND
+        )
+        new_url = reverse('posts:group_list', kwargs={'slug': 'new-slug'})
+        self.client.get(new_url)
+        group.delete()
+        self.assertEqual(
+            self.client.get(new_url).status_code, HTTPStatus.NOT_FOUND
+        )
+        self.assertTrue(generations.profile('Стас').isascii())
+
+    def test_username_change_resets_profile(self):
+        """Старый адрес профиля перестает отдаваться после переименования."""
+        cache.clear()
+        author = User.objects.create_user(username='old_name')
+        Post.objects.create(text='Пост автора', author=author)
+        old_url = reverse('posts:profile', kwargs={'username': 'old_name'})
+        self.assertEqual(self.client.get(old_url).status_code, HTTPStatus.OK)
+        author.username = 'new_name'
+        author.save()
+        self.assertEqual(
+            self.client.get(old_url).status_code, HTTPStatus.NOT_FOUND
+        )
+
+    def test_cards_follow_renames(self):
+        """Карточки показывают новые имя автора и slug группы."""
+        cache.clear()
+        author = User.objects.create_user(username='renamed')
+        group = Group.objects.create(title='Группа', slug='before')
+        Post.objects.create(text='Пост', author=author, group=group)
+        profile_url = reverse('posts:profile', kwargs={'username': author})
+        self.assertContains(self.client.get(profile_url), '/group/before/')
+        group.slug = 'after'
+        group.save()
+        self.assertContains(self.client.get(profile_url), '/group/after/')
+        author.first_name = 'Переименованный'
+        author.save()
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Переименованный'
+        )
+
+    def test_post_cards_cache(self):
+        """Правка поста сбрасывает только его карточку."""
+        cache.clear()
+        other = Post.objects.create(text='Другой пост', author=self.user)
+        self.authorized_client.get(reverse('posts:index'))
+        for post in (self.post, other):
+            self.assertIsNotNone(
+                cache.get(cards.card_key(post, cards.LIST_CARD))
+            )
+        # Карточка без новой версии берется из кеша
+        Post.objects.filter(pk=other.pk).update(text='Без сигналов')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный текст', 'group': self.group.pk},
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный текст')
+        self.assertContains(response, 'Другой пост')
+        self.assertNotContains(response, 'Без сигналов')
+
+
+class ConditionalGetTest(TestCase):
+    """Ответ 304 для неизменившихся страниц."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.user)
+        self.client = Client()
+
+    def test_feed_not_modified(self):
+        """Лента отдает 304, пока не изменится ее поколение."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Новый пост')
+
+    def test_post_detail_not_modified(self):
+        """Страница поста проверяется одним запросом к базе."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class FeedViewsTest(TestCase):
+    """Ленты RSS, Atom и JSON Feed."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Пост <в ленте> & с разметкой',
+            author=self.user,
+            group=self.group
+        )
+        self.urls = [
+            reverse(name, kwargs={**kwargs, 'kind': kind})
+            for name, kwargs in (
+                ('posts:index_feed', {}),
+                ('posts:group_feed', {'slug': self.group.slug}),
+                ('posts:profile_feed', {'username': self.user.username}),
+            )
+            for kind in ('rss', 'atom', 'json')
+        ]
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_feeds_are_valid(self):
+        """Ленты разбираются и содержат текст поста."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                content = self.content(response)
+                if url.endswith('/json/'):
+                    item = json.loads(content)['items'][0]
+                    self.assertEqual(item['content_text'], self.post.text)
+                else:
+                    document = ElementTree.fromstring(content)
+                    self.assertIn(self.post.text, ''.join(document.itertext()))
+
+    def test_feed_cache_and_conditional_get(self):
+        """Повторный запрос не трогает базу, новый пост меняет ленту."""
+        url = reverse('posts:index_feed', kwargs={'kind': 'atom'})
+        response = self.client.get(url)
+        self.content(response)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+            self.assertContains(self.client.get(url), 'в ленте')
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Новый пост'.encode(), self.content(response))
+
+    def test_feed_links_follow_host(self):
+        """Ссылки ленты строятся от хоста и схемы текущего запроса."""
+        url = reverse('posts:index_feed', kwargs={'kind': 'json'})
+        with self.settings(ALLOWED_HOSTS=['first.test', 'second.test']):
+            for host, secure in (
+                ('first.test', False),
+                ('second.test', False),
+                ('second.test', True),
+            ):
+                with self.subTest(host=host, secure=secure):
+                    response = self.client.get(
+                        url, HTTP_HOST=host, secure=secure
+                    )
+                    item = json.loads(self.content(response))['items'][0]
+                    scheme = 'https' if secure else 'http'
+                    self.assertTrue(
+                        item['url'].startswith(f'{scheme}://{host}/')
+                    )
+
+    def test_feed_not_found(self):
+        """Неизвестный формат и группа дают 404."""
+        for url in (
+            reverse('posts:index_feed', kwargs={'kind': 'html'}),
+            reverse(
+                'posts:group_feed', kwargs={'slug': 'missing', 'kind': 'rss'}
+            ),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
 
 class PaginatorViewsTest(TestCase):
@@ -259,6 +483,47 @@ class PaginatorViewsTest(TestCase):
                     POSTS_ON_PAGE_2
                 )
 
+    def test_cursor_pages(self):
+        """Курсорная пагинация листает ленту вперед и назад."""
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response_1 = self.client.get(url)
+        page_1 = response_1.context['page_obj']
+        self.assertEqual(len(page_1), POSTS_ON_PAGE_1)
+        self.assertFalse(page_1.has_previous())
+        self.assertTrue(page_1.has_next())
+
+        response_2 = self.client.get(url, data={'after': page_1.next_cursor})
+        page_2 = response_2.context['page_obj']
+        self.assertEqual(len(page_2), POSTS_ON_PAGE_2)
+        self.assertFalse(page_2.has_next())
+        self.assertTrue(page_2.has_previous())
+        self.assertFalse(set(page_1) & set(page_2))
+
+        response_back = self.client.get(
+            url, data={'before': page_2.previous_cursor}
+        )
+        self.assertEqual(
+            list(response_back.context['page_obj']), list(page_1)
+        )
+
+    def test_cursor_page_without_count(self):
+        """Первая страница ленты не выполняет COUNT."""
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_broken_cursor_opens_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.client.get(url, data={'after': 'broken!'})
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_PAGE_1)
+
 
 class FollowerTest(TestCase):
     """Тест подписок."""
@@ -287,3 +552,372 @@ class FollowerTest(TestCase):
         follow = Follow.objects.filter(user=self.follower,
                                        author=self.user).exists()
         self.assertEqual(follow, False)
+
+    def test_profile_follow_button(self):
+        """Кнопка отражает подписку текущего пользователя."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.user)
+        response = self.follow_client.get(url)
+        self.assertFalse(response.context['following'])
+        self.follow_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.user}))
+        response = self.follow_client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertTrue(response.context['can_follow'])
+        author_client = Client()
+        author_client.force_login(self.user)
+        response = author_client.get(url)
+        self.assertFalse(response.context['can_follow'])
+
+    def test_follower_profile_counts(self):
+        """Число подписок в профиле подписчика меняется сразу."""
+        url = reverse('posts:profile', kwargs={'username': self.follower})
+        self.assertContains(self.client.get(url), 'подписок: 0')
+        self.follow_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.user}))
+        self.assertContains(self.client.get(url), 'подписок: 1')
+        self.follow_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': self.user})
+        )
+        self.assertContains(self.client.get(url), 'подписок: 0')
+
+    def test_follow_graph(self):
+        """Проверки подписки читаются из кеша и сбрасываются подпиской."""
+        authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        Follow.objects.create(user=self.follower, author=authors[0])
+        self.assertTrue(follows.is_following(self.follower, authors[0]))
+        with self.assertNumQueries(0):
+            self.assertFalse(follows.is_following(self.follower, authors[1]))
+            self.assertFalse(follows.is_following(self.follower, authors[2]))
+        Follow.objects.create(user=self.follower, author=authors[1])
+        self.assertTrue(follows.is_following(self.follower, authors[1]))
+        Follow.objects.filter(author=authors[0]).delete()
+        self.assertFalse(follows.is_following(self.follower, authors[0]))
+        self.assertEqual(follows.counts(self.follower), (0, 1))
+
+    def test_follow_index_timeline(self):
+        """Лента подписок пополняется при подписке и новых постах."""
+        follow_url = reverse('posts:follow_index')
+        self.follow_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.user}))
+        response = self.follow_client.get(follow_url)
+        self.assertIn(self.post, response.context['page_obj'])
+
+        new_post = Post.objects.create(
+            author=self.user,
+            text='Новый пост для подписчиков',
+        )
+        # В ленты пост рассылает фоновая задача
+        tasks.run_pending()
+        response = self.follow_client.get(follow_url)
+        self.assertEqual(response.context['page_obj'][0], new_post)
+
+        self.follow_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': self.user})
+        )
+        response = self.follow_client.get(follow_url)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_post_not_in_foreign_timeline(self):
+        """Пост не попадает в ленту того, кто не подписан на автора."""
+        Post.objects.create(author=self.user, text='Тестовый текст 2')
+        tasks.run_pending()
+        response = self.follow_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_timeline_length_is_capped(self):
+        """Длина ленты ограничена TIMELINE_LENGTH."""
+        Follow.objects.create(user=self.follower, author=self.user)
+        with mock.patch('posts.timeline.TIMELINE_LENGTH', 2):
+            for i in range(3):
+                Post.objects.create(author=self.user, text=f'Пост {i}')
+            tasks.run_pending()
+        self.assertEqual(self.follower.timeline.count(), 2)
+        self.assertFalse(self.follower.timeline.filter(post=self.post))
+
+    def test_trim_single_query(self):
+        """Ленты всех подписчиков обрезаются одним запросом."""
+        readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(5)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.user)
+        with mock.patch('posts.timeline.TIMELINE_LENGTH', 0):
+            with self.assertNumQueries(1):
+                timeline.trim([reader.pk for reader in readers])
+        self.assertFalse(
+            TimelineEntry.objects.filter(user__in=readers).exists()
+        )
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.follower, author=self.user)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertTrue(
+            self.follower.timeline.filter(post=self.post).exists()
+        )
+
+
+class SearchViewTest(TestCase):
+    """Тест полнотекстового поиска."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='StasBasov')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Джанго и полнотекстовый поиск',
+        )
+        Post.objects.create(author=self.user, text='Совсем другой текст')
+
+    def test_search_finds_post(self):
+        """Поиск находит пост по слову в любом регистре."""
+        response = self.client.get(reverse('posts:search'), {'q': 'ДЖАНГО'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_search_follows_edits_and_deletes(self):
+        """Индекс обновляется при редактировании и удалении поста."""
+        self.post.text = 'Новый текст про кеш'
+        self.post.save()
+        url = reverse('posts:search')
+        self.assertEqual(
+            len(self.client.get(url, {'q': 'джанго'}).context['page_obj']), 0
+        )
+        self.assertEqual(
+            len(self.client.get(url, {'q': 'кеш'}).context['page_obj']), 1
+        )
+        self.post.delete()
+        self.assertEqual(
+            len(self.client.get(url, {'q': 'кеш'}).context['page_obj']), 0
+        )
+
+    def test_search_syntax_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не приводят к ошибке."""
+        response = self.client.get(
+            reverse('posts:search'), {'q': '"джанго" OR (NEAR*'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_reindex_command(self):
+        """Команда reindex_posts восстанавливает индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        call_command('reindex_posts', stdout=StringIO())
+        self.assertEqual(
+            list(search.filter_posts(Post.objects.all(), 'джанго')),
+            [self.post]
+        )
+
+
+class QueryPlanTest(TestCase):
+    """Ленты читаются по индексу, без сортировки всей выборки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(title='Группа', slug='plan')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        for i in range(POSTS_TOTAL):
+            post = Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {i}'
+            )
+        cls.post = post
+        post.comments.create(author=cls.follower, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.follower)
+
+    def ordered_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'ORDER BY' in query['sql']
+        ]
+
+    def test_feeds_use_indexes(self):
+        """EXPLAIN лент не содержит временной сортировки."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for url in urls:
+            queries = self.ordered_queries(url)
+            self.assertTrue(queries)
+            for sql in queries:
+                with self.subTest(url=url, sql=sql):
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                        plan = ' '.join(str(row) for row in cursor.fetchall())
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    self.assertIn('INDEX', plan)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора невозможна."""
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.follower, author=self.user)
+
+
+class TrendingTest(TestCase):
+    """Рейтинг популярных постов."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='StasBasov')
+        self.client.force_login(self.user)
+        self.old, self.fresh, self.quiet = (
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+            for i in range(3)
+        )
+
+    def test_comments_decay(self):
+        """Свежий комментарий весит больше нескольких старых."""
+        now = timezone.now()
+        for _ in range(3):
+            trending.bump(self.old.pk, now - timedelta(days=2))
+        trending.bump(self.fresh.pk, now)
+        self.assertEqual(
+            [entry.post_id for entry in TrendingPost.objects.all()],
+            [self.fresh.pk, self.old.pk]
+        )
+        with mock.patch('posts.trending.LEADERBOARD_SIZE', 1):
+            trending.trim()
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('post_id', flat=True)),
+            [self.fresh.pk]
+        )
+
+    def test_trim_keeps_ties(self):
+        """Обрезка не удаляет посты с очками, равными пограничным."""
+        for post in (self.old, self.fresh, self.quiet):
+            TrendingPost.objects.create(post=post, score=1.0)
+        with mock.patch('posts.trending.LEADERBOARD_SIZE', 2):
+            trending.trim()
+        self.assertEqual(TrendingPost.objects.count(), 2)
+
+    def test_add_comment_and_rerank(self):
+        """Комментарий поднимает пост, пересчет дает те же очки."""
+        for post in (self.old, self.fresh, self.fresh):
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                {'text': 'Комментарий'}
+            )
+        scores = dict(TrendingPost.objects.values_list('post_id', 'score'))
+        self.assertEqual(list(scores), [self.fresh.pk, self.old.pk])
+        TrendingPost.objects.all().delete()
+        call_command('rerank_trending', stdout=StringIO())
+        for post_id, score in TrendingPost.objects.values_list(
+            'post_id', 'score'
+        ):
+            self.assertAlmostEqual(score, scores[post_id])
+
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.fresh, self.old]
+        )
+        self.assertTrue(response.context['trending'])
+        self.assertContains(response, reverse('posts:trending'))
+
+
+class GroupIndexTest(TestCase):
+    """Каталог групп и сводки групп."""
+
+    def setUp(self):
+        cache.clear()
+        self.first = Group.objects.create(title='Первая', slug='first')
+        self.second = Group.objects.create(title='Вторая', slug='second')
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.posts = [
+            Post.objects.create(author=author, group=group, text='Текст')
+            for author, group in (
+                (self.author, self.first),
+                (self.author, self.first),
+                (self.other, self.first),
+                (self.other, self.second),
+            )
+        ]
+
+    def summary(self):
+        return {
+            stats.group_id: (
+                stats.posts_count, stats.last_post_date, stats.top_authors
+            )
+            for stats in GroupStats.objects.all()
+        }
+
+    def test_stats_follow_posts(self):
+        """Сводки меняются при создании, переносе и удалении постов."""
+        stats = self.first.stats
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 3)
+        self.assertEqual(stats.last_post_date, self.posts[2].pub_date)
+        self.assertEqual(
+            stats.top_author_ids, [self.author.pk, self.other.pk]
+        )
+
+        moved = self.posts[2]
+        moved.group = self.second
+        moved.save()
+        self.posts[3].delete()
+        summary = self.summary()
+        self.assertEqual(
+            summary[self.first.pk][:2], (2, self.posts[1].pub_date)
+        )
+        self.assertEqual(summary[self.second.pk][:2], (1, moved.pub_date))
+        group_stats.rebuild()
+        self.assertEqual(self.summary(), summary)
+
+    def test_group_index_constant_queries(self):
+        url = reverse('posts:group_index')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for i in range(5):
+            group = Group.objects.create(title=f'Группа {i}', slug=f'g{i}')
+            author = User.objects.create_user(username=f'author{i}')
+            Post.objects.create(author=author, group=group, text='Текст')
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(few), len(many))
+        page = list(response.context['page_obj'])
+        self.assertEqual(page[0], self.first)
+        self.assertEqual(page[0].top_authors, [self.author, self.other])
+
+    def test_group_index_follows_renames(self):
+        """Каталог сбрасывается при смене имени автора и удалении группы."""
+        url = reverse('posts:group_index')
+        self.client.get(url)
+        self.author.first_name = 'Новое имя'
+        self.author.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новое имя')
+        self.second.delete()
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Вторая')
+
+    def test_bump_author_lost_race(self):
+        """Приращение не теряется, если строку вставили параллельно."""
+        group = Group.objects.create(title='Третья', slug='third')
+        manager = GroupAuthorStats.objects
+        get_or_create = manager.get_or_create
+
+        def concurrent_insert(**kwargs):
+            # Параллельная транзакция вставляет строку между
+            # неудачным UPDATE и нашим get_or_create
+            manager.create(group=group, author=self.author, posts_count=1)
+            return get_or_create(**kwargs)
+
+        with mock.patch.object(manager, 'get_or_create', concurrent_insert):
+            group_stats.post_added(group.pk, self.author.pk, timezone.now())
+        self.assertEqual(
+            manager.get(group=group, author=self.author).posts_count, 2
+        )
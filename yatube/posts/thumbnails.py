@@ -0,0 +1,44 @@
+"""Миниатюры изображений постов.
+
+Миниатюры известных размеров строятся фоновой задачей после
+сохранения поста, готовый URL записывается в Post.thumbnail. Шаблоны
+выводят сохраненный URL и не обращаются ни к картинке, ни к
+хранилищу ключей sorl.
+"""
+from django.db.models import F
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+from posts import generations
+from posts.models import Post
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+@task
+def generate(post_id):
+    """Строит миниатюру поста и сохраняет ее URL."""
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author_id', 'group_id'
+    ).first()
+    if post is None or not post.image:
+        return None
+    thumbnail = get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+    )
+    # Картинку могли заменить, пока строилась миниатюра
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=thumbnail.url,
+        version=F('version') + 1,
+        updated=timezone.now()
+    )
+    if updated:
+        generations.invalidate_post(post)
+    return thumbnail.url
+
+
+def schedule(post_id):
+    """Ставит построение миниатюры в очередь вместе с сохранением поста."""
+    generate.delay(post_id)
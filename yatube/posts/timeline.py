@@ -0,0 +1,121 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост записывается в ленты подписчиков автора
+фоновой задачей, при подписке лента дополняется постами автора,
+при отписке - очищается от них. Длина ленты ограничена
+TIMELINE_LENGTH.
+"""
+from django.db import connection
+
+from core.tasks import task
+from posts.bulk import chunked
+from posts.models import Follow, Post, TimelineEntry
+
+TIMELINE_LENGTH = 1000
+# Число лент в одном DELETE при обрезке. Размер пачек INSERT выбирает
+# бэкенд: в Django 2.2 явный batch_size у bulk_create не ограничивается
+# лимитом SQLite на число параметров запроса
+BATCH_SIZE = 500
+# Номер записи в ленте пользователя считает оконная функция, поэтому
+# пачка лент обрезается одним DELETE, а не запросами на каждую ленту
+TRIM_SQL = (
+    'DELETE FROM {table} WHERE id IN ('
+    'SELECT id FROM ('
+    'SELECT id, ROW_NUMBER() OVER ('
+    'PARTITION BY user_id ORDER BY pub_date DESC, id DESC'
+    ') AS position FROM {table} WHERE user_id IN ({users})'
+    ') WHERE position > %s)'
+)
+
+
+def trim(user_ids):
+    """Обрезает ленты пользователей до TIMELINE_LENGTH записей."""
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        for chunk in chunked(user_ids, BATCH_SIZE):
+            cursor.execute(
+                TRIM_SQL.format(
+                    table=table, users=', '.join(['%s'] * len(chunk))
+                ),
+                [*chunk, TIMELINE_LENGTH]
+            )
+
+
+@task
+def fan_out(post_id):
+    """Добавляет пост в ленты всех подписчиков автора.
+
+    Подписчиков у автора может быть много, поэтому рассылка идет
+    в воркере, а публикация поста только ставит ее в очередь.
+    """
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        # Пост удалили раньше, чем до него дошла очередь
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post['author_id'])
+        .values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id, post_id=post_id, pub_date=post['pub_date']
+            )
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True
+    )
+    trim(follower_ids)
+
+
+def backfill(user_id, author_id):
+    """Дополняет ленту пользователя последними постами автора."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date')
+        .values_list('pk', 'pub_date')[:TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True
+    )
+    trim([user_id])
+
+
+def drop(user_id, author_id):
+    """Убирает посты автора из ленты пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    """Пересобирает все ленты с нуля, возвращает число записей."""
+    TimelineEntry.objects.all().delete()
+    follows = {}
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id'
+    ):
+        follows.setdefault(user_id, []).append(author_id)
+
+    total = 0
+    for user_id, author_ids in follows.items():
+        posts = (
+            Post.objects.filter(author_id__in=author_ids)
+            .order_by('-pub_date')
+            .values_list('pk', 'pub_date')[:TIMELINE_LENGTH]
+        )
+        entries = TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts
+            ]
+        )
+        total += len(entries)
+    return total
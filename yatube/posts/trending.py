@@ -0,0 +1,98 @@
+"""Популярные посты: рейтинг с затуханием во времени.
+
+Каждый комментарий дает посту очко, которое вдвое теряет вес за
+HALF_LIFE. Чтобы не пересчитывать со временем все очки, рейтинг
+хранится в логарифмической шкале от EPOCH:
+score = log2(сумма 2 ** ((t - EPOCH) / HALF_LIFE)) по комментариям.
+Все посты затухают одинаково, поэтому порядок по score совпадает
+с порядком по текущему весу, а комментарий меняет только свой пост.
+
+Таблица TrendingPost хранит не больше LEADERBOARD_SIZE лучших постов,
+команда rerank_trending пересчитывает ее по комментариям за WINDOW.
+Удаление комментария очков не уменьшает, поэтому команду нужно
+запускать по расписанию, например раз в час из cron (см. README).
+"""
+import math
+from datetime import datetime, timedelta
+from heapq import nlargest
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Comment, TrendingPost
+
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = timedelta(hours=12)
+# За WINDOW вес комментария падает в 2 ** 14 раз
+WINDOW = timedelta(days=7)
+LEADERBOARD_SIZE = 1000
+
+
+def points(moment):
+    """Очко комментария, оставленного в moment, в шкале score."""
+    return (moment - EPOCH) / HALF_LIFE
+
+
+def add_points(score, value):
+    """log2(2 ** score + 2 ** value) без переполнения."""
+    high, low = max(score, value), min(score, value)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def trim():
+    """Убирает посты за пределами LEADERBOARD_SIZE лучших.
+
+    Удаляются именно строки после LEADERBOARD_SIZE-й, а не все
+    с очками не выше пограничных: посты с равными очками на границе
+    остаются в рейтинге.
+    """
+    extra = list(
+        TrendingPost.objects.order_by('-score', 'pk')
+        .values_list('pk', flat=True)[LEADERBOARD_SIZE:]
+    )
+    if extra:
+        TrendingPost.objects.filter(pk__in=extra).delete()
+
+
+@transaction.atomic
+def bump(post_id, moment):
+    """Добавляет посту очко комментария, оставленного в moment."""
+    value = points(moment)
+    score = TrendingPost.objects.select_for_update().filter(
+        post_id=post_id
+    ).values_list('score', flat=True).first()
+    if score is not None:
+        value = add_points(score, value)
+    TrendingPost.objects.update_or_create(
+        post_id=post_id, defaults={'score': value}
+    )
+    trim()
+
+
+def rerank(now=None):
+    """Пересчитывает рейтинг по комментариям за WINDOW.
+
+    Исправляет очки, не учтенные сигналами (массовая загрузка,
+    удаленные комментарии), и убирает остывшие посты. Возвращает
+    число постов в рейтинге.
+    """
+    since = (now or timezone.now()) - WINDOW
+    scores = {}
+    comments = Comment.objects.filter(pub_date__gte=since).values_list(
+        'post_id', 'pub_date'
+    ).order_by()
+    for post_id, pub_date in comments.iterator():
+        value = points(pub_date)
+        score = scores.get(post_id)
+        scores[post_id] = value if score is None else add_points(
+            score, value
+        )
+    best = nlargest(LEADERBOARD_SIZE, scores.items(), key=itemgetter(1))
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post_id=post_id, score=score)
+            for post_id, score in best
+        )
+    return len(best)
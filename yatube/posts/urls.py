@@ -7,12 +7,30 @@ app_name = 'posts'
 urlpatterns = [
     # Главная страница
     path('', views.index, name='index'),
+    # Популярные записи
+    path('trending/', views.trending, name='trending'),
+    # Каталог групп
+    path('group/', views.group_index, name='group_index'),
     # Страница записей группы
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Ленты RSS, Atom и JSON Feed
+    path('feed/<str:kind>/', views.index_feed, name='index_feed'),
+    path(
+        'group/<slug:slug>/feed/<str:kind>/',
+        views.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:kind>/',
+        views.profile_feed,
+        name='profile_feed'
+    ),
+    # Поиск по записям
+    path('search/', views.search_posts, name='search'),
     # Добавление новой записи
     path('create/', views.post_create, name='post_create'),
     # Редактирование записи
@@ -1,24 +1,91 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import DateTimeField, Max, OuterRef, Subquery
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 from django.shortcuts import (
     get_object_or_404,
     redirect,
     render
 )
-from django.views.decorators.cache import cache_page
 
-from core.paginator import paginator
+from core.cache import cache_feed
+from core.db_router import read_replica
+from core.paginator import cursor_paginator, page_paginator, paginator
 
+from posts import cards, feeds, follows, generations, suggestions
+from posts.search import SearchResults
+from posts.counters import get_stats
 from posts.forms import CommentForm, PostForm
-from posts.models import Comment, Follow, Group, Post, User
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    GroupStats,
+    Post,
+    TrendingPost,
+    User
+)
+
+COMMENTS_ON_PAGE = 20
 
 
-# а в шаблоне тогда не надо кешировать?
-@cache_page(20)
+@cache_feed(generations.INDEX)
 def index(request):
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
     post_list = Post.objects.select_related('author', 'group')
     page_obj = paginator(request, post_list)
+    page_obj.object_list = cards.attach(page_obj.object_list)
+
+    context = {
+        'title': title,
+        'page_obj': page_obj,
+        'index': True,
+    }
+    return render(request, template, context)
+
+
+@read_replica
+def trending(request):
+    template = 'posts/trending.html'
+    title = 'Популярные записи'
+    # Рейтинг ограничен, поэтому обычная пагинация стоит немного
+    entries = TrendingPost.objects.select_related(
+        'post__author', 'post__group'
+    )
+    page_obj = page_paginator(request, entries)
+    page_obj.object_list = cards.attach(entry.post for entry in page_obj)
+
+    context = {
+        'title': title,
+        'page_obj': page_obj,
+        'trending': True,
+    }
+    return render(request, template, context)
+
+
+@cache_feed(generations.GROUPS)
+def group_index(request):
+    template = 'posts/group_index.html'
+    title = 'Сообщества'
+    # Сводки ведутся сигналами: страница стоит постоянного числа
+    # запросов при любом количестве постов в группах
+    groups = Group.objects.select_related('stats').order_by(
+        '-stats__posts_count', 'title'
+    )
+    page_obj = page_paginator(request, groups)
+    for group in page_obj:
+        if not hasattr(group, 'stats'):
+            group.stats = GroupStats(group=group)
+    authors = User.objects.in_bulk({
+        pk for group in page_obj for pk in group.stats.top_author_ids
+    })
+    for group in page_obj:
+        group.top_authors = [
+            authors[pk] for pk in group.stats.top_author_ids if pk in authors
+        ]
 
     context = {
         'title': title,
@@ -27,12 +94,16 @@ def index(request):
     return render(request, template, context)
 
 
+@cache_feed(generations.group)
 def group_posts(request, slug: str):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     title = f'Записи сообщества {group}'
     post_list = group.posts.select_related('author')
     page_obj = paginator(request, post_list)
+    page_obj.object_list = cards.attach(
+        page_obj.object_list, cards.GROUP_CARD
+    )
 
     context = {
         'group': group,
@@ -42,32 +113,87 @@ def group_posts(request, slug: str):
     return render(request, template, context)
 
 
+@cache_feed(generations.profile)
 def profile(request, username: str):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    author_posts = author.posts.select_related('author')
-    amount = author_posts.count()
-    following = author.following.all()
+    author_posts = author.posts.select_related('author', 'group')
+    stats = get_stats(author)
+    following = follows.is_following(request.user, author)
     title = f'Все посты пользователя {author}'
     page_obj = paginator(request, author_posts)
+    page_obj.object_list = cards.attach(
+        page_obj.object_list, cards.PROFILE_CARD
+    )
 
     context = {
         'author': author,
-        'amount': amount,
+        'amount': stats.posts_count,
+        'stats': stats,
         'following': following,
+        'can_follow': (
+            request.user.is_authenticated and request.user != author
+        ),
         'title': title,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'suggestions': suggestions.for_user(
+            request.user, exclude=(author.pk,)
+        ),
     }
     return render(request, template, context)
 
 
+def post_validators(request, post_id):
+    """ETag и Last-Modified страницы поста одним запросом.
+
+    Страница меняется вместе с версией поста, его комментариями,
+    числом постов автора и текущим пользователем.
+    """
+    if not hasattr(request, '_post_validators'):
+        last_comment = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(
+            last=Max('updated')
+        ).values('last')
+        row = Post.objects.filter(pk=post_id).order_by().annotate(
+            last_comment=Subquery(last_comment, output_field=DateTimeField())
+        ).values_list(
+            'version', 'updated', 'comments_count', 'last_comment',
+            'author__stats__posts_count'
+        ).first()
+        request._post_validators = (None, None)
+        if row is not None:
+            version, updated, comments, last_comment, posts = row
+            last_modified = max(filter(None, (updated, last_comment)))
+            etag = '-'.join(map(str, (
+                version, comments, last_modified.timestamp(), posts,
+                request.user.pk or 0
+            )))
+            request._post_validators = (etag, last_modified)
+    return request._post_validators
+
+
+@read_replica
+@condition(
+    etag_func=lambda request, post_id: post_validators(request, post_id)[0],
+    last_modified_func=(
+        lambda request, post_id: post_validators(request, post_id)[1]
+    )
+)
 def post_detail(request, post_id: int):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    amount = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        pk=post_id
+    )
+    amount = get_stats(post.author).posts_count
     is_edit = post.author == request.user
     comment_form = CommentForm()
-    comments = Comment.objects.select_related('post')
+    comments = cursor_paginator(
+        request,
+        post.comments.select_related('author'),
+        per_page=COMMENTS_ON_PAGE
+    )
 
     context = {
         'post': post,
@@ -79,7 +205,59 @@ def post_detail(request, post_id: int):
     return render(request, template, context)
 
 
+def search_posts(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    title = f'Поиск: {query}' if query else 'Поиск'
+    page_obj = page_paginator(request, SearchResults(query))
+    page_obj.object_list = cards.attach(page_obj.object_list)
+
+    context = {
+        'title': title,
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&'
+    }
+    return render(request, template, context)
+
+
+def index_feed(request, kind: str):
+    return feeds.respond(
+        request, kind, generations.INDEX,
+        lambda: (
+            'Последние обновления на сайте',
+            reverse('posts:index'),
+            Post.objects.all()
+        )
+    )
+
+
+def group_feed(request, slug: str, kind: str):
+    def source():
+        group = get_object_or_404(Group, slug=slug)
+        return (
+            f'Записи сообщества {group}',
+            reverse('posts:group_list', kwargs={'slug': slug}),
+            group.posts.all()
+        )
+    return feeds.respond(request, kind, generations.group(slug), source)
+
+
+def profile_feed(request, username: str, kind: str):
+    def source():
+        author = get_object_or_404(User, username=username)
+        return (
+            f'Все посты пользователя {author}',
+            reverse('posts:profile', kwargs={'username': username}),
+            author.posts.all()
+        )
+    return feeds.respond(
+        request, kind, generations.profile(username), source
+    )
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     group_list = Group.objects.all()
@@ -130,6 +308,7 @@ def post_edit(request, post_id: int):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -142,21 +321,28 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_replica
 def follow_index(request):
     # информация о текущем пользователе доступна в переменной request.user
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
+    entries = request.user.timeline.select_related(
+        'post__author', 'post__group'
+    )
     title = 'Подписки'
-    page_obj = paginator(request, post_list)
+    page_obj = paginator(request, entries)
+    page_obj.object_list = cards.attach(entry.post for entry in page_obj)
 
     context = {
         'title': title,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'suggestions': suggestions.for_user(request.user),
+        'follow': True,
     }
     return render(request, template, context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
@@ -169,6 +355,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     # Отписаться от автора
     author = get_object_or_404(User, username=username)
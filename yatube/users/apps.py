@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        # Сброс пользователя в кеше при его изменении
+        from users import signals  # noqa: F401
@@ -0,0 +1,39 @@
+"""Пользователь запроса из общего кеша.
+
+AuthenticationMiddleware на каждом запросе читает пользователя из
+базы по id из сессии. CachedModelBackend хранит его в кеше, а сессии
+лежат в cached_db, поэтому прогретый запрос авторизованного
+пользователя доходит до view без запросов к базе. Запись в кеш
+сбрасывается при сохранении и удалении пользователя (смена пароля,
+правка профиля, вход) и при выходе.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+USER_KEY = 'user:{}'
+USER_CACHE_TIMEOUT = 60 * 60
+
+
+def forget_user(user_id):
+    """Сбрасывает пользователя в кеше сразу и после фиксации транзакции.
+
+    Второй сброс убирает запись, которую параллельный запрос мог
+    прочитать из базы до фиксации изменений.
+    """
+    key = USER_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
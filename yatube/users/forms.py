@@ -1,5 +1,11 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.sites.shortcuts import get_current_site
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.tasks import task
 
 User = get_user_model()
 
@@ -10,3 +16,60 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+@task
+def send_password_reset(user_pk, domain, site_name, use_https,
+                        subject_template_name, email_template_name,
+                        from_email=None, html_email_template_name=None,
+                        extra_email_context=None):
+    """Собирает и отправляет письмо со ссылкой для сброса пароля.
+
+    Токен создается здесь, в воркере: в очереди лежат только pk
+    пользователя и адрес сайта, ссылку из аргументов задачи не узнать.
+    """
+    user = User.objects.filter(pk=user_pk, is_active=True).first()
+    if user is None:
+        return
+    email = getattr(user, User.get_email_field_name())
+    context = {
+        'email': email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+        **(extra_email_context or {}),
+    }
+    PasswordResetForm().send_mail(
+        subject_template_name, email_template_name, context, from_email,
+        email, html_email_template_name=html_email_template_name
+    )
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Сброс пароля, письмо отправляется фоновой задачей.
+
+    В очередь ставятся только pk пользователя и адрес сайта: ссылка
+    с токеном собирается в задаче и в базе не хранится. Токен
+    всегда создает default_token_generator.
+    """
+
+    def save(self, domain_override=None,
+             subject_template_name='registration/password_reset_subject.txt',
+             email_template_name='registration/password_reset_email.html',
+             use_https=False, token_generator=default_token_generator,
+             from_email=None, request=None, html_email_template_name=None,
+             extra_email_context=None):
+        if domain_override:
+            site_name = domain = domain_override
+        else:
+            site = get_current_site(request)
+            site_name, domain = site.name, site.domain
+        for user in self.get_users(self.cleaned_data['email']):
+            send_password_reset.delay(
+                user.pk, domain, site_name, use_https,
+                subject_template_name, email_template_name, from_email,
+                html_email_template_name, extra_email_context
+            )
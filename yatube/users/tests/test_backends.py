@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from users.backends import CachedModelBackend
+
+User = get_user_model()
+
+
+class CachedUserTest(TestCase):
+    """Сессия и пользователь запроса из кеша."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='StasBasov', password='old-password'
+        )
+        self.backend = CachedModelBackend()
+
+    def test_user_cached_and_invalidated(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        self.user.first_name = 'Стас'
+        self.user.save()
+        self.assertEqual(
+            self.backend.get_user(self.user.pk).first_name, 'Стас'
+        )
+        self.user.delete()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_warm_request_without_queries(self):
+        """Прогретый запрос не читает сессию и пользователя из базы."""
+        self.client.login(username='StasBasov', password='old-password')
+        url = reverse('about:author')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_logs_out_other_sessions(self):
+        other = self.client_class()
+        other.login(username='StasBasov', password='old-password')
+        self.client.login(username='StasBasov', password='old-password')
+        other.get(reverse('about:author'))
+        self.client.post(reverse('users:password_change_form'), {
+            'old_password': 'old-password',
+            'new_password1': 'new-Passw0rd-42',
+            'new_password2': 'new-Passw0rd-42',
+        })
+        response = other.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
+        response = self.client.get(reverse('about:author'))
+        self.assertTrue(response.context['user'].is_authenticated)
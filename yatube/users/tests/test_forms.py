@@ -0,0 +1,39 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+
+from core import tasks
+from core.models import Task
+
+User = get_user_model()
+
+
+class PasswordResetTest(TestCase):
+    """Письмо сброса пароля отправляется фоновой задачей."""
+
+    def test_email_sent_by_task(self):
+        user = User.objects.create_user(
+            username='forgetful', email='forgetful@example.com',
+            password='secret-password'
+        )
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'forgetful@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        # В очереди нет ни ссылки, ни токена - только pk и адрес сайта
+        arguments = Task.objects.get().arguments
+        self.assertNotIn('/auth/reset/', arguments)
+        self.assertNotIn(default_token_generator.make_token(user), arguments)
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['forgetful@example.com'])
+        link = re.search(r'http://testserver(/auth/reset/\S+)',
+                         mail.outbox[0].body)
+        response = self.client.get(link.group(1), follow=True)
+        self.assertTrue(response.context['validlink'])
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from core.sqlite_backend import PRODUCTION_OPTIONS
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -46,10 +48,15 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',  # Регистрация приложения users
     'core.apps.CoreConfig',  # Регистрация приложения core
     'about.apps.AboutConfig',  # Регистрация приложения about
+    'api.apps.ApiConfig',  # JSON API только для чтения
     'sorl.thumbnail',  # Приложение для работы с графикой
 ]
 
 MIDDLEWARE = [
+    # Метрики запроса в заголовке Server-Timing и в логе
+    'core.middleware.TimingMiddleware',
+    # Чтение из основной базы сразу после собственной записи
+    'core.middleware.StickyPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,7 +71,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Шаблонизатор Django с замером времени рендеринга
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -88,11 +96,29 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite с WAL, прагмами соединения и BEGIN IMMEDIATE
+        'ENGINE': 'core.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переиспользуется запросами потока
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': PRODUCTION_OPTIONS,
     }
 }
 
+# Реплики для чтения. Для локальной проверки YATUBE_SQLITE_REPLICAS=N
+# добавляет N файлов-реплик, их заполняет команда sync_replicas
+for number in range(1, int(os.environ.get('YATUBE_SQLITE_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        # В тестах реплика - та же база, что и основная
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Сколько секунд после своей записи пользователь читает из основной базы
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,6 +164,8 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 # Директория загрузки файлов пользователей
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Загрузки пишутся на диск порциями с ограничением размера
+FILE_UPLOAD_HANDLERS = ['posts.images.LimitedUploadHandler']
 
 
 # Эти константы указывают адреса страниц, на которые пользователь
@@ -146,6 +174,10 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+# Сессии и пользователь запроса читаются из кеша, база - при промахе
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
 
 #  подключаем движок filebased.EmailBackend
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -157,9 +189,20 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 
-# бэкенд кэширования
+# бэкенд кэширования: файл SQLite, общий для всех процессов сервера
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
+# Тесты работают с временным файлом кеша, а не с кешем сервера
+TEST_RUNNER = 'core.test_runner.TempCacheRunner'
+
+
+# Файл для самых медленных запросов процесса (None - не сохранять)
+TIMING_SLOW_LOG = None
+TIMING_SLOWEST = 20